@@ -0,0 +1,153 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Parties tracked by the scrapers, in array row order
+parties = ["npp_votes", "sjb_votes", "ndf_votes", "uvd_votes", "slpp_votes", "mjp_votes"]
+
+# Seats elected in each electoral district (Parliamentary election 2024)
+district_seats = {
+    "Colombo": 18, "Gampaha": 19, "Kalutara": 11, "Kandy": 12, "Matale": 5, "Nuwara Eliya": 8,
+    "Galle": 9, "Matara": 7, "Hambantota": 7, "Jaffna": 6, "Vanni": 6, "Batticaloa": 5,
+    "Digamadulla": 7, "Trincomalee": 4, "Kurunegala": 15, "Puttalam": 8, "Anuradhapura": 9,
+    "Polonnaruwa": 5, "Badulla": 9, "Moneragala": 6, "Ratnapura": 11, "Kegalle": 9,
+}
+districts = list(district_seats)
+district_aliases = {"Nuwara-Eliya": "Nuwara Eliya", "Monaragala": "Moneragala"}
+
+# Share of the district's valid votes a party needs to win seats
+cutoff = 0.05
+
+# Function to find the electoral district of a division name like "Colombo District - Colombo North"
+def district_for(division):
+    name = division.split(" - ")[0].strip()
+    if name.endswith(" District"):
+        name = name[:-len(" District")]
+    name = district_aliases.get(name, name)
+    if name in district_seats:
+        return name
+    for district in districts:
+        if division.lower().startswith(district.lower()):
+            return district
+    return None
+
+# Function to allocate every district's seats in one pass over a party x district vote matrix:
+# parties under the 5% cutoff are dropped, the leading party gets the bonus seat, and the
+# other seats go by whole quotas of the qualifying votes and then largest remainders.
+def allocate_seats(votes, valid_votes, seats):
+    votes = np.asarray(votes, dtype=np.float64)
+    valid_votes = np.maximum(np.asarray(valid_votes, dtype=np.float64), votes.sum(axis=0))
+    seats = np.asarray(seats, dtype=np.int64)
+    counted = valid_votes > 0
+
+    qualifying = np.where(votes >= cutoff * valid_votes, votes, 0.0)
+    relevant_votes = qualifying.sum(axis=0)
+    remaining_seats = seats - 1
+    quota = np.divide(relevant_votes, remaining_seats, out=np.zeros_like(relevant_votes), where=remaining_seats > 0)
+
+    allocation = np.floor(np.divide(qualifying, quota, out=np.zeros_like(qualifying), where=quota > 0)).astype(np.int64)
+    leftover = remaining_seats - allocation.sum(axis=0)
+    remainders = np.where(qualifying > 0, qualifying - allocation * quota, -1.0)
+    # Position of each party when its district's remainders are sorted from largest to smallest
+    positions = np.argsort(np.argsort(-remainders, axis=0, kind="stable"), axis=0)
+    allocation += (positions < leftover) & (remainders >= 0)
+
+    leaders = votes.argmax(axis=0)
+    allocation[leaders, np.arange(votes.shape[1])] += 1
+    return np.where(counted, allocation, 0)
+
+# Running totals and seat projection built up one division at a time. Votes are kept as a
+# party x division array, and district and all-island totals are updated incrementally,
+# so a revised division replaces its earlier numbers instead of being counted twice.
+# Rows start with the tracked parties; every other party on a page gets a row, keyed by its
+# name, the first time it is seen, so the cutoff, quotas and bonus seat count all parties.
+class ResultsAggregator:
+    def __init__(self, tracked_parties=parties, capacity=256):
+        self.parties = list(tracked_parties)
+        self.tracked = len(self.parties)
+        self.rows = {party: row for row, party in enumerate(self.parties)}
+        self.columns = {}
+        self.division_districts = []
+        self.votes = np.zeros((len(self.parties), capacity), dtype=np.int64)
+        self.valid = np.zeros(capacity, dtype=np.int64)
+        self.district_votes = np.zeros((len(self.parties), len(districts)), dtype=np.int64)
+        self.district_valid = np.zeros(len(districts), dtype=np.int64)
+        self.island_votes = np.zeros(len(self.parties), dtype=np.int64)
+        self.island_valid = 0
+        self.seats = np.array([district_seats[district] for district in districts], dtype=np.int64)
+
+    def _column(self, division):
+        if division not in self.columns:
+            if len(self.columns) == self.votes.shape[1]:
+                self.votes = np.concatenate([self.votes, np.zeros_like(self.votes)], axis=1)
+                self.valid = np.concatenate([self.valid, np.zeros_like(self.valid)])
+            district = district_for(division)
+            if district is None:
+                logger.warning("No electoral district found for %s, counting it in all-island totals only.", division)
+            self.columns[division] = len(self.columns)
+            self.division_districts.append(districts.index(district) if district else -1)
+        return self.columns[division]
+
+    def _row(self, party):
+        if party not in self.rows:
+            self.rows[party] = len(self.parties)
+            self.parties.append(party)
+            self.votes = np.vstack([self.votes, np.zeros(self.votes.shape[1], dtype=np.int64)])
+            self.district_votes = np.vstack([self.district_votes, np.zeros(len(districts), dtype=np.int64)])
+            self.island_votes = np.append(self.island_votes, 0)
+        return self.rows[party]
+
+    # Function to add or replace one division's numbers. parties is the page's full party list
+    # as given by PartyResults.to_list(party_map); entries without a "key" are untracked parties.
+    def update(self, division, candidate_data, general_data, parties=None):
+        column = self._column(division)
+        division_votes = dict(candidate_data)
+        for party in parties or ():
+            if not party.get("key"):
+                division_votes[party["name"]] = party["votes"]
+        for party in division_votes:
+            self._row(party)
+        new_votes = np.array([division_votes.get(party) or 0 for party in self.parties], dtype=np.int64)
+        new_valid = general_data.get("valid") or int(new_votes.sum())
+        delta_votes = new_votes - self.votes[:, column]
+        delta_valid = new_valid - self.valid[column]
+
+        self.votes[:, column] = new_votes
+        self.valid[column] = new_valid
+        self.island_votes += delta_votes
+        self.island_valid += delta_valid
+        district = self.division_districts[column]
+        if district >= 0:
+            self.district_votes[:, district] += delta_votes
+            self.district_valid[district] += delta_valid
+
+    def seat_projection(self):
+        return allocate_seats(self.district_votes, self.district_valid, self.seats)
+
+    # Function to map party to count, tracked parties are always listed and other parties only when non-zero
+    def _listed(self, counts):
+        return {party: int(count) for row, (party, count) in enumerate(zip(self.parties, counts))
+                if count or row < self.tracked}
+
+    # Function to build the JSON document published next to each division's results
+    def summary(self):
+        allocation = self.seat_projection()
+        district_summary = {}
+        for index, district in enumerate(districts):
+            if self.district_valid[index] == 0:
+                continue
+            district_summary[district] = {
+                "votes": self._listed(self.district_votes[:, index]),
+                "valid_votes": int(self.district_valid[index]),
+                "seats": {party: int(seats) for party, seats in zip(self.parties, allocation[:, index]) if seats},
+            }
+        return {
+            "divisions_counted": len(self.columns),
+            "all_island": {
+                "votes": self._listed(self.island_votes),
+                "valid_votes": int(self.island_valid),
+                "seats": self._listed(allocation.sum(axis=1)),
+            },
+            "districts": district_summary,
+        }
@@ -0,0 +1,91 @@
+import json
+import threading
+import time
+from tracking import result_fingerprint
+
+# Append-only log of every scraped snapshot, one compact JSON object per line:
+#   {"scraped_at": 1731000000.0, "source": "adaderana", "division": "...", "fingerprint": "...",
+#    "candidate_data": {...}, "general_data": {...}, "parties": [...]}
+# parties lists every party on the page (PartyResults.to_list) and is left out when not given.
+# Nothing is ever rewritten, so the whole night reads back with one sequential scan.
+class ResultsArchive:
+    def __init__(self, path="results_archive.ndjson"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = None
+
+    # Function to append one snapshot, returns the written record
+    def append(self, source, division, candidate_data, general_data, fingerprint=None, scraped_at=None, parties=None):
+        record = {
+            "scraped_at": time.time() if scraped_at is None else scraped_at,
+            "source": source,
+            "division": division,
+            "fingerprint": fingerprint or result_fingerprint(candidate_data, general_data, parties),
+            "candidate_data": candidate_data,
+            "general_data": general_data,
+        }
+        if parties is not None:
+            record["parties"] = parties
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self.lock:
+            if self.file is None:
+                self.file = open(self.path, "a", encoding="utf-8")
+            self.file.write(line)
+            self.file.flush()
+        return record
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+# Function to stream snapshots in the order they were scraped, optionally for one source or after a time.
+# A line cut short by a crash mid-write is skipped.
+def read_snapshots(path="results_archive.ndjson", source=None, since=None):
+    with open(path, "r", encoding="utf-8") as archive_file:
+        for line in archive_file:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if source is not None and record["source"] != source:
+                continue
+            if since is not None and record["scraped_at"] < since:
+                continue
+            yield record
+
+# Returns {(source, division): latest snapshot}
+def latest_state(path="results_archive.ndjson", source=None):
+    return {(record["source"], record["division"]): record for record in read_snapshots(path, source)}
+
+# Function to read the votes of the parties a snapshot doesn't track as {party name: votes}
+def _untracked_votes(snapshot):
+    return {party["name"]: party["votes"] for party in snapshot.get("parties", ()) if not party.get("key")}
+
+# Function to list the numbers that differ between two snapshots of a division as {field: (old, new)},
+# untracked parties are listed by name
+def diff_snapshots(previous, current):
+    changes = {}
+    sections = [
+        (previous.get("candidate_data", {}) if previous else {}, current.get("candidate_data", {})),
+        (previous.get("general_data", {}) if previous else {}, current.get("general_data", {})),
+        (_untracked_votes(previous) if previous else {}, _untracked_votes(current)),
+    ]
+    for old_values, new_values in sections:
+        for field in old_values.keys() | new_values.keys():
+            if old_values.get(field) != new_values.get(field):
+                changes[field] = (old_values.get(field), new_values.get(field))
+    return changes
+
+# Function to stream (snapshot, changes) for every snapshot whose numbers differ from the
+# division's previous one; a division's first snapshot is compared against nothing
+def iter_changes(path="results_archive.ndjson", source=None):
+    previous = {}
+    for record in read_snapshots(path, source):
+        key = (record["source"], record["division"])
+        last = previous.get(key)
+        if last is not None and last["fingerprint"] == record["fingerprint"]:
+            continue
+        previous[key] = record
+        yield record, diff_snapshots(last, record)
@@ -0,0 +1,90 @@
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import corpus_dir, extract, kinds, load_corpus, parse
+from extractors import backends
+
+# Function to parse every page of a kind once, rejected pages count like parsed ones
+def parse_all(backend, kind, pages):
+    for html in pages:
+        try:
+            parse(backend, kind, html)
+        except Exception:
+            pass
+
+# Function to measure one backend: {kind: (pages per second, peak traced KiB of one pass)}
+def measure(backend, pages_by_kind, seconds):
+    results = {}
+    for kind, pages in pages_by_kind.items():
+        parse_all(backend, kind, pages)
+        rounds = 0
+        started_at = time.perf_counter()
+        while time.perf_counter() - started_at < seconds:
+            parse_all(backend, kind, pages)
+            rounds += 1
+        pages_per_second = rounds * len(pages) / (time.perf_counter() - started_at)
+
+        # Measured separately, tracing slows the parsers down
+        tracemalloc.start()
+        parse_all(backend, kind, pages)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        results[kind] = (pages_per_second, peak / 1024)
+    return results
+
+# Function to benchmark one backend in this process and print a machine-readable line per kind
+def run_single(name, corpus, seconds):
+    backend = backends[name]()
+    pages = load_corpus(corpus)
+    # Only pages that still match their golden output count, a fast wrong parser proves nothing
+    wrong = [f"{kind}/{page}" for kind, page, html, expected in pages if extract(backend, kind, html) != expected]
+    pages_by_kind = {kind: [html for page_kind, _, html, _ in pages if page_kind == kind] for kind in kinds}
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results = measure(backend, {kind: html for kind, html in pages_by_kind.items() if html}, seconds)
+    rss_growth = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss
+    for kind, (pages_per_second, peak_kib) in results.items():
+        print(f"{kind} {len(pages_by_kind[kind])} {pages_per_second:.1f} {peak_kib:.1f}")
+    print(f"rss {rss_growth} {','.join(wrong) or '-'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Pages per second and peak memory of each extractor on the page corpus.")
+    parser.add_argument("--corpus", default=corpus_dir, help="Corpus directory with <kind>/<name>.html pages")
+    parser.add_argument("--seconds", type=float, default=2.0, help="Seconds of parsing per backend and page kind")
+    parser.add_argument("--single", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_single(args.single, args.corpus, args.seconds)
+        return 0
+
+    # Each backend runs in a fresh process so its peak RSS isn't shared with the others
+    failures = 0
+    print(f"{'backend':<8}{'pages':<11}{'count':>7}{'pages/s':>11}{'peak KiB':>10}")
+    for name in backends:
+        completed = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", name, "--corpus", args.corpus,
+                                    "--seconds", str(args.seconds)], capture_output=True, text=True)
+        lines = completed.stdout.splitlines()
+        if completed.returncode or not lines:
+            print(f"{name:<8}skipped: {(completed.stderr.strip().splitlines() or ['no output'])[-1]}")
+            continue
+        for line in lines[:-1]:
+            kind, count, pages_per_second, peak_kib = line.split()
+            print(f"{name:<8}{kind:<11}{count:>7}{float(pages_per_second):>11.0f}{float(peak_kib):>10.1f}")
+        _, rss_growth, wrong = lines[-1].split()
+        print(f"{name:<8}process peak RSS grew {int(rss_growth) / 1024:.1f} MiB while parsing")
+        if wrong != "-":
+            print(f"[ERROR] {name} no longer matches the golden output for {wrong}, run check_corpus.py")
+            failures += 1
+    print("\npeak KiB is the Python heap traced by tracemalloc during one pass over the pages;"
+          "\nlxml builds its trees in C memory, which only the process RSS line includes.")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,72 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataderana
+import datamain
+from extractors import backends
+
+samples_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+# Function to read a saved page from the samples directory
+def load_page(directory, name):
+    with open(os.path.join(directory, name), "r", encoding="utf-8") as page_file:
+        return page_file.read()
+
+# Function to build the (label, call) pairs benchmarked for one backend
+def extraction_cases(backend, pages):
+    return [
+        ("extract_division_links", lambda: backend.division_index_rows(pages["index"])),
+        ("extract_division_results", lambda: backend.division_results(pages["division"], dataderana.party_map)),
+        ("extract_relevant_data", lambda: backend.allisland_results(pages["allisland"], datamain.candidates)),
+        ("division_records", lambda: backend.division_records(pages["division"])[0].to_list()),
+        ("allisland_records", lambda: backend.allisland_records(pages["allisland"])[1].to_list()),
+    ]
+
+# Function to time one call, returns milliseconds per page
+def time_call(call, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        call()
+    return (time.perf_counter() - start) * 1000 / rounds
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare HTML extraction backends on saved pages.")
+    parser.add_argument("--samples", default=samples_dir, help="Directory with the saved pages")
+    parser.add_argument("--rounds", type=int, default=200, help="Parses per page and backend")
+    args = parser.parse_args()
+
+    pages = {
+        "index": load_page(args.samples, "adaderana_index.html"),
+        "division": load_page(args.samples, "adaderana_division.html"),
+        "allisland": load_page(args.samples, "elections_allisland.html"),
+    }
+
+    instances = {}
+    for name, backend_class in backends.items():
+        try:
+            instances[name] = backend_class()
+        except ImportError as e:
+            print(f"[WARNING] Skipping backend {name}: {e}")
+
+    reference = instances["bs4"]
+    timings = {}
+    for name, backend in instances.items():
+        for (label, call), (_, reference_call) in zip(extraction_cases(backend, pages), extraction_cases(reference, pages)):
+            if call() != reference_call():
+                print(f"[ERROR] {name} output differs from bs4 for {label}")
+                return 1
+            timings[name, label] = time_call(call, args.rounds)
+
+    print(f"{'extractor':<28}" + "".join(f"{name:>12}" for name in instances) + f"{'speedup':>10}")
+    for label, _ in extraction_cases(reference, pages):
+        row = f"{label:<28}" + "".join(f"{timings[name, label]:>10.3f}ms" for name in instances)
+        fastest = min(timings[name, label] for name in instances)
+        print(row + f"{timings['bs4', label] / fastest:>9.1f}x")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,134 @@
+import argparse
+import http.server
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+from http_client import CircuitOpenError, ResilientSession, RetryBudget
+from standin import summarize
+
+# Local server that misbehaves on purpose:
+#   /stall       never answers within the client's read timeout
+#   /flaky/N     answers 503 to the first N requests, then 200
+#   /down        always answers 503
+#   /tail/P      one request in P takes slow_seconds, the rest answer at once
+class StallingServer:
+    def __init__(self, stall_seconds=30.0, slow_seconds=1.0):
+        self.stall_seconds = stall_seconds
+        self.slow_seconds = slow_seconds
+        self.counters = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def count(self, path):
+        with self.lock:
+            self.counters[path] = self.counters.get(path, 0) + 1
+            return self.counters[path]
+
+    def start(self):
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status = site.respond(self.path)
+                body = b"ok" if status == 200 else b"unavailable"
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def respond(self, path):
+        number = self.count(path)
+        path = path.split("?")[0]
+        if path == "/stall":
+            time.sleep(self.stall_seconds)
+            return 200
+        if path.startswith("/flaky/"):
+            return 503 if number <= int(path.rsplit("/", 1)[1]) else 200
+        if path == "/down":
+            return 503
+        if path.startswith("/tail/"):
+            if number % int(path.rsplit("/", 1)[1]) == 0:
+                time.sleep(self.slow_seconds)
+            return 200
+        return 404
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# Function to time one request, returns (seconds, status code or exception name)
+def timed_get(session, url):
+    start = time.perf_counter()
+    try:
+        outcome = session.get(url).status_code
+    except requests.exceptions.RequestException as e:
+        outcome = type(e).__name__
+    return time.perf_counter() - start, outcome
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise the resilient HTTP client against a deliberately misbehaving server.")
+    parser.add_argument("--read-timeout", type=float, default=1.0, help="Client read timeout in seconds")
+    parser.add_argument("--requests", type=int, default=200, help="Requests in the tail latency comparison")
+    parser.add_argument("--hedge-after", type=float, default=0.05, help="Seconds before a slow request is hedged")
+    args = parser.parse_args()
+
+    server = StallingServer(slow_seconds=args.read_timeout / 2)
+    base_url = server.start()
+    timeout = (0.5, args.read_timeout)
+    failures = 0
+
+    session = ResilientSession(timeout=timeout, retries=1, backoff=0.05)
+    seconds, outcome = timed_get(session, base_url + "/stall")
+    print(f"stall:   {outcome} after {seconds:.2f}s (one retry, read timeout {args.read_timeout}s)")
+    failures += seconds > 3 * args.read_timeout
+
+    session = ResilientSession(timeout=timeout, retries=3, backoff=0.05)
+    seconds, outcome = timed_get(session, base_url + "/flaky/2")
+    print(f"flaky:   {outcome} after {seconds:.2f}s (two 503s retried)")
+    failures += outcome != 200
+
+    session = ResilientSession(timeout=timeout, retries=3, backoff=0.01, retry_budget=RetryBudget(2))
+    outcomes = [timed_get(session, base_url + f"/flaky/9{i}")[1] for i in range(3)]
+    print(f"budget:  {outcomes} (retry budget of 2 per cycle)")
+    failures += server.counters.get("/flaky/90", 0) + server.counters.get("/flaky/91", 0) + server.counters.get("/flaky/92", 0) != 5
+
+    session = ResilientSession(timeout=timeout, retries=0, failure_threshold=5, reset_timeout=60)
+    results = [timed_get(session, base_url + "/down") for _ in range(8)]
+    rejected = [seconds for seconds, outcome in results if outcome == CircuitOpenError.__name__]
+    print(f"down:    {server.counters.get('/down', 0)} requests reached the server, {len(rejected)} rejected by the open circuit "
+          f"in {max(rejected, default=0) * 1000:.2f}ms or less")
+    failures += len(rejected) != 3
+
+    print(f"\n{'tail (ms)':<22}{'count':>8}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}")
+    for label, hedge_after in (("no hedging", None), (f"hedge after {args.hedge_after}s", args.hedge_after)):
+        session = ResilientSession(timeout=timeout, retries=0, hedge_after=hedge_after)
+        path = f"/tail/10?hedge={hedge_after}"
+        timings = [timed_get(session, base_url + path)[0] for _ in range(args.requests)]
+        summary = summarize(timings)
+        print(f"{label:<22}{summary['count']:>8}{summary['mean']:>11.1f}{summary['p50']:>11.1f}"
+              f"{summary['p90']:>11.1f}{summary['p99']:>11.1f}{summary['max']:>11.1f}")
+        session.close()
+
+    server.stop()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import argparse
+import functools
+import os
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataderana
+import datamain
+from standin import StandInSite, adaderana_path, allisland_path, webhook_path, summarize
+
+# Collects wall-clock durations per pipeline stage
+class StageTimer:
+    def __init__(self):
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, seconds):
+        with self.lock:
+            self.timings.setdefault(stage, []).append(seconds)
+
+    # Function to wrap a callable so every call is timed under a stage name
+    def wrap(self, stage, func):
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+        return timed
+
+# Wraps an extraction backend so each parse is timed
+class TimedExtractor:
+    def __init__(self, extractor, timer):
+        self.name = extractor.name
+        self.division_index_rows = timer.wrap("parse", extractor.division_index_rows)
+        self.division_records = timer.wrap("parse", extractor.division_records)
+        self.allisland_records = timer.wrap("parse", extractor.allisland_records)
+
+# Function to point a monitor module at the stand-in and time its fetch, parse and publish stages
+def instrument(module, base_url, timer, poll_interval):
+    module.webhook_url = base_url + webhook_path
+    state_dir = tempfile.mkdtemp()
+    module.state_db_path = os.path.join(state_dir, "bench_state.db")
+    module.archive_path = os.path.join(state_dir, "bench_archive.ndjson")
+    module.poll_interval = poll_interval
+    module.burst_interval = poll_interval / 4
+    module.max_poll_interval = poll_interval
+    module.extractor = TimedExtractor(module.extractor, timer)
+    module.fetcher.session.get = timer.wrap("fetch", module.fetcher.session.get)
+    module.send_json_to_discord = timer.wrap("publish", module.send_json_to_discord)
+
+def configure_adaderana(base_url, timer, poll_interval):
+    dataderana.website_url = base_url + adaderana_path + "index.php"
+    dataderana.base_url = base_url + adaderana_path
+    instrument(dataderana, base_url, timer, poll_interval)
+    return dataderana.monitor_website
+
+def configure_elections(base_url, timer, poll_interval):
+    datamain.website_url = base_url + allisland_path
+    instrument(datamain, base_url, timer, poll_interval)
+    return datamain.monitor_website
+
+sources = {
+    "adaderana": configure_adaderana,
+    "elections": configure_elections,
+}
+
+def print_summary(label, summary):
+    if not summary["count"]:
+        print(f"{label:<22}{'-':>8}")
+        return
+    print(f"{label:<22}{summary['count']:>8}{summary['mean']:>11.1f}{summary['p50']:>11.1f}"
+          f"{summary['p90']:>11.1f}{summary['p99']:>11.1f}{summary['max']:>11.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure detection-to-publish latency against local stand-ins.")
+    parser.add_argument("source", choices=sorted(sources), help="Monitor pipeline to run")
+    parser.add_argument("--release-interval", type=float, default=1.0, help="Seconds between division releases")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="Seconds the monitor sleeps between polls")
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait after the last release")
+    parser.add_argument("--revise", type=int, default=0,
+                        help="adaderana only: revise this many divisions after all are published and check they are edited in place")
+    args = parser.parse_args()
+
+    site = StandInSite(release_interval=args.release_interval)
+    base_url = site.start()
+    timer = StageTimer()
+    monitor = sources[args.source](base_url, timer, args.poll_interval)
+
+    threading.Thread(target=monitor, daemon=True).start()
+    deadline = time.monotonic() + args.release_interval * len(site.divisions) + args.settle
+    expected = site.divisions if args.source == "adaderana" else site.divisions[-1:]
+    while time.monotonic() < deadline and site.publish_report(expected)[2]:
+        time.sleep(0.05)
+    latencies, duplicates, missing = site.publish_report(expected)
+
+    revised = site.divisions[:args.revise] if args.source == "adaderana" and not missing else []
+    posts_before_revisions = len(site.posts)
+    for division in revised:
+        site.revise(division)
+    deadline = time.monotonic() + args.settle
+    while revised and time.monotonic() < deadline and len(site.edits) < len(revised):
+        time.sleep(0.05)
+    site.stop()
+
+    print(f"\n{'stage (ms)':<22}{'count':>8}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}")
+    # publish is the time the scrape loop spends handing a message to the publish queue
+    for stage in ("fetch", "parse", "publish"):
+        print_summary(stage, summarize(timer.timings.get(stage, [])))
+    print_summary("detection-to-publish", summarize(latencies))
+    print(f"\npublished: {len(latencies)}  duplicates: {duplicates}  missing: {len(missing)}")
+    if revised:
+        edited = {division for _, division, _, _ in site.edits}
+        uploads = sum(uploaded for _, _, _, uploaded in site.edits)
+        print(f"revised: {len(revised)}  edited in place: {len(edited & set(revised))}  new posts: {len(site.posts) - posts_before_revisions}"
+              f"  files uploaded by edits: {uploads}")
+        missing = missing or [division for division in revised if division not in edited]
+    return 1 if missing else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from renderer import PhotoshopRenderer, RenderCache, layer_values
+
+# Counts every attribute read and write, each of which is a COM round trip with real Photoshop
+class ComCounter:
+    calls = 0
+
+class FakeComObject:
+    def __init__(self, **attributes):
+        object.__setattr__(self, "attributes", attributes)
+
+    def __getattr__(self, name):
+        ComCounter.calls += 1
+        try:
+            return self.attributes[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def __setattr__(self, name, value):
+        ComCounter.calls += 1
+        self.attributes[name] = value
+
+# Function to build a fake text layer
+def text_layer(name):
+    return FakeComObject(Name=name, Kind=2, TextItem=FakeComObject(Contents=""))
+
+# Fake Photoshop document: text layers for the template keys plus decoration layers and groups
+class FakeDocument(FakeComObject):
+    def __init__(self, layer_names, decoration_layers):
+        layers = [text_layer(name) for name in layer_names]
+        layers += [FakeComObject(Name=f"shape {i}", Kind=1) for i in range(decoration_layers)]
+        layers += [FakeComObject(Name="group")]  # layer sets have no Kind
+        super().__init__(Name="template.psd", Layers=layers, saved={})
+
+    def SaveAs(self, output_file_path, options, as_copy):
+        ComCounter.calls += 1
+        contents = {layer.attributes["Name"]: layer.attributes["TextItem"].attributes["Contents"]
+                    for layer in self.attributes["Layers"] if layer.attributes.get("Kind") == 2}
+        self.attributes["saved"][output_file_path] = contents
+        with open(output_file_path, "wb") as image_file:
+            image_file.write(b"\xff\xd8\xff")
+
+class FakePhotoshop:
+    def __init__(self, layer_names, decoration_layers):
+        self.layer_names = layer_names
+        self.decoration_layers = decoration_layers
+        self.opened = 0
+        self.document = None
+
+    def Open(self, path):
+        ComCounter.calls += 1
+        self.opened += 1
+        self.document = FakeDocument(self.layer_names, self.decoration_layers)
+        return self.document
+
+# Function to build the layer values of one fake division
+def division_values(index, revision=0):
+    vote_data = {party: 1000 * index + revision for party in
+                 ("npp_votes", "sjb_votes", "ndf_votes", "uvd_votes", "slpp_votes", "mjp_votes")}
+    general_data = {"valid": 9000 * index, "polled": 9500 * index, "electors": 12000 * index, "rejected": 500 * index}
+    return layer_values(f"Division {index}", vote_data, general_data)
+
+def main():
+    parser = argparse.ArgumentParser(description="Count Photoshop COM calls and render cache hits against a fake document.")
+    parser.add_argument("--divisions", type=int, default=50, help="Divisions rendered per pass")
+    parser.add_argument("--decoration-layers", type=int, default=40, help="Non-text layers in the fake PSD")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp()
+    template_path = os.path.join(work_dir, "template.psd")
+    with open(template_path, "wb") as template_file:
+        template_file.write(b"8BPS")
+
+    layer_names = list(division_values(1))
+    app = FakePhotoshop(layer_names, args.decoration_layers)
+    renderer = PhotoshopRenderer(template_path, app=app, save_options=object())
+    cache = RenderCache(os.path.join(work_dir, "render_cache.json"))
+
+    # First pass renders everything, the second repeats the same numbers with one division revised
+    passes = [[division_values(i) for i in range(1, args.divisions + 1)],
+              [division_values(i, revision=1 if i == 1 else 0) for i in range(1, args.divisions + 1)]]
+    for number, values_list in enumerate(passes, 1):
+        ComCounter.calls = 0
+        rendered = reused = 0
+        for values in values_list:
+            if cache.get(template_path, values):
+                reused += 1
+                continue
+            output_file_path = os.path.join(work_dir, f"{values['district_name']}.jpg")
+            renderer.render(values, output_file_path)
+            if app.document.attributes["saved"][output_file_path] != {name: values[name] for name in layer_names}:
+                print(f"[ERROR] {output_file_path} was saved with the wrong layer contents")
+                return 1
+            cache.put(template_path, values, output_file_path)
+            rendered += 1
+        per_render = ComCounter.calls / rendered if rendered else 0
+        print(f"pass {number}: rendered {rendered:>4}  reused {reused:>4}  COM calls {ComCounter.calls:>6} ({per_render:.1f} per render)")
+
+    print(f"documents opened: {app.opened}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
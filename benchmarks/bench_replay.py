@@ -0,0 +1,87 @@
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataderana
+import datamain
+from metrics import setup_logging
+from bench_latency import StageTimer, print_summary, sources
+from standin import ReplaySite, load_timeline, samples_dir, summarize, timeline_from_archive
+
+modules = {"adaderana": dataderana, "elections": datamain}
+
+# Function to count the divisions released so far and the distinct ones published
+def progress(site):
+    released = len(site.released())
+    with site.lock:
+        published = len({division for _, division, _ in site.posts})
+    return released, published
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded election night against the real monitors, compressed in time.")
+    parser.add_argument("source", choices=sorted(sources), help="Monitor pipeline to run")
+    parser.add_argument("--timeline", default=os.path.join(samples_dir, "adaderana_timeline.json"),
+                        help="Recorded release timeline JSON")
+    parser.add_argument("--archive", help="Build the timeline from a results archive instead")
+    parser.add_argument("--speedup", type=float, default=96.0, help="Time compression, 96 plays 8 hours in 5 minutes")
+    parser.add_argument("--multiply", type=int, default=1, help="Copies of every division to release")
+    parser.add_argument("--spread", type=float, default=900.0, help="Timeline seconds over which copies follow the original")
+    parser.add_argument("--poll-interval", type=float, help="Monitor poll interval (default: the configured one compressed by --speedup)")
+    parser.add_argument("--webhook-limit", type=int, nargs=2, default=[5, 2], metavar=("POSTS", "SECONDS"),
+                        help="Webhook rate limit answered with 429, like Discord (0 0 disables)")
+    parser.add_argument("--settle", type=float, default=30.0, help="Seconds to wait for the backlog after the last release")
+    parser.add_argument("--log-level", default="WARNING", help="Log level of the monitor while replaying")
+    args = parser.parse_args()
+    setup_logging(args.log_level)
+
+    releases = timeline_from_archive(args.archive) if args.archive else load_timeline(args.timeline)
+    module = modules[args.source]
+    poll_interval = args.poll_interval or max(0.05, module.poll_interval / args.speedup)
+    webhook_limit = tuple(args.webhook_limit) if args.webhook_limit[0] else None
+    site = ReplaySite(releases, args.speedup, args.multiply, args.spread, webhook_limit=webhook_limit)
+    base_url = site.start()
+    timer = StageTimer()
+    monitor = sources[args.source](base_url, timer, poll_interval)
+    print(f"Replaying {len(site.divisions)} divisions over {site.duration:.1f}s (speedup {args.speedup:g}x, poll {poll_interval:.2f}s)")
+
+    threading.Thread(target=monitor, daemon=True).start()
+    expected = site.divisions if args.source == "adaderana" else None
+    deadline = time.monotonic() + site.duration + args.settle
+    max_backlog = max_queue = 0
+    samples = []
+    while time.monotonic() < deadline:
+        released, published = progress(site)
+        backlog = released - published if expected is not None else 0
+        max_backlog = max(max_backlog, backlog)
+        max_queue = max(max_queue, module.publisher.depth)
+        samples.append((time.monotonic() - site.started_at, released, published, module.publisher.depth))
+        if expected is not None and published == len(expected):
+            break
+        if expected is None and released == len(site.divisions) and not site.publish_report(site.divisions[-1:])[2]:
+            break
+        time.sleep(0.1)
+
+    latencies, duplicates, missing = site.publish_report(expected if expected is not None else site.divisions[-1:])
+    elapsed = time.monotonic() - site.started_at
+    site.stop()
+
+    print(f"\n{'elapsed (s)':>12}{'released':>10}{'published':>11}{'queue':>8}")
+    step = max(1, len(samples) // 10)
+    for at, released, published, depth in samples[::step] + samples[-1:]:
+        print(f"{at:>12.1f}{released:>10}{published:>11}{depth:>8}")
+
+    print(f"\n{'stage (ms)':<22}{'count':>8}{'mean':>11}{'p50':>11}{'p90':>11}{'p99':>11}{'max':>11}")
+    for stage in ("fetch", "parse", "publish"):
+        print_summary(stage, summarize(timer.timings.get(stage, [])))
+    print_summary("detection-to-publish", summarize(latencies))
+    print(f"\nthroughput: {len(latencies) / elapsed:.1f} publishes/s  max backlog: {max_backlog} divisions"
+          f"  max queue depth: {max_queue}  rate limited: {site.rate_limited}")
+    print(f"published: {len(latencies)}  duplicates: {duplicates}  missing: {len(missing)}")
+    return 1 if missing else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,80 @@
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataderana
+import sharded
+from metrics import setup_logging
+from standin import ReplaySite, adaderana_path, load_timeline, samples_dir, webhook_path
+
+# Function to point dataderana at the stand-in with a throwaway state database
+def configure(base_url, extraction_backend):
+    state_dir = tempfile.mkdtemp()
+    dataderana.website_url = base_url + adaderana_path + "index.php"
+    dataderana.base_url = base_url + adaderana_path
+    dataderana.webhook_url = base_url + webhook_path
+    dataderana.state_db_path = os.path.join(state_dir, "bench_state.db")
+    dataderana.archive_path = os.path.join(state_dir, "bench_archive.ndjson")
+    dataderana.poll_interval = 0.5
+    dataderana.burst_interval = 0.2
+    dataderana.max_poll_interval = 0.5
+    dataderana.metrics_port = 0
+    dataderana.extraction_backend = extraction_backend
+    dataderana.log_level = "WARNING"
+
+# Function to release every division at once and time the sharded pipeline until all are published
+def run_once(workers, multiply, extraction_backend, timeout):
+    setup_logging("WARNING")
+    site = ReplaySite(load_timeline(os.path.join(samples_dir, "adaderana_timeline.json")), speedup=1e9, multiply=multiply)
+    configure(site.start(), extraction_backend)
+
+    threading.Thread(target=sharded.monitor_sharded, args=(workers,), daemon=True).start()
+    # Wait for the first publish so worker start-up isn't counted
+    while not site.posts and time.monotonic() - site.started_at < timeout:
+        time.sleep(0.01)
+    started_at = time.monotonic()
+    published_before = len(site.posts)
+    while site.publish_report()[2] and time.monotonic() - started_at < timeout:
+        time.sleep(0.02)
+    elapsed = time.monotonic() - started_at
+    latencies, duplicates, missing = site.publish_report()
+    site.stop()
+    print(f"{workers} {len(latencies) - published_before} {elapsed:.3f} {duplicates} {len(missing)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure how sharded.py scales with worker processes.")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--multiply", type=int, default=40, help="Copies of every sample division (6 each)")
+    parser.add_argument("--backend", default="bs4", help="Extraction backend, bs4 makes parsing the bottleneck")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Seconds to wait for one run")
+    parser.add_argument("--single", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        run_once(args.single, args.multiply, args.backend, args.timeout)
+        return 0
+
+    # Each run gets a fresh process, the monitor and its workers never stop by themselves
+    print(f"{'workers':>8}{'divisions':>11}{'seconds':>10}{'per second':>12}{'speedup':>9}{'duplicates':>12}{'missing':>9}")
+    baseline = None
+    for workers in args.workers:
+        output = subprocess.run([sys.executable, os.path.abspath(__file__), "--single", str(workers),
+                                 "--multiply", str(args.multiply), "--backend", args.backend, "--timeout", str(args.timeout)],
+                                capture_output=True, text=True).stdout.split()
+        if len(output) != 5:
+            print(f"{workers:>8}  run failed")
+            continue
+        _, divisions, seconds, duplicates, missing = output
+        rate = int(divisions) / float(seconds)
+        baseline = baseline or rate
+        print(f"{workers:>8}{divisions:>11}{float(seconds):>10.2f}{rate:>12.1f}{rate / baseline:>8.2f}x{duplicates:>12}{missing:>9}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from standin import StandInSite, adaderana_path, allisland_path, webhook_path
+
+root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+cli_path = os.path.join(root_dir, "election_tool.py")
+
+# Modules a headless monitor should never load
+gui_modules = ("tkinter", "win32com", "msvcrt", "googletrans", "PIL")
+
+# Stand-in that remembers when each page was first requested
+class FirstPollSite(StandInSite):
+    def __init__(self):
+        super().__init__(release_interval=3600)
+        self.first_requests = {}
+        self.first_request = threading.Event()
+
+    def reset(self):
+        with self.lock:
+            self.first_requests.clear()
+        self.first_request.clear()
+
+    def handle_get(self, path):
+        with self.lock:
+            self.first_requests.setdefault(path.lstrip("/").split("?")[0], time.monotonic())
+        self.first_request.set()
+        return super().handle_get(path)
+
+# Function to write a config file pointing every monitor at the stand-in
+def write_config(base_url, directory):
+    config = {
+        "defaults": {
+            "webhook_url": base_url + webhook_path,
+            "state_db_path": os.path.join(directory, "startup_state.db"),
+            "archive_path": os.path.join(directory, "startup_archive.ndjson"),
+            "metrics_port": 0,
+            "log_level": "WARNING",
+        },
+        "dataderana": {"website_url": base_url + adaderana_path + "index.php", "base_url": base_url + adaderana_path},
+        "datamain": {"website_url": base_url + allisland_path},
+    }
+    config_path = os.path.join(directory, "election_config.json")
+    with open(config_path, "w", encoding="utf-8") as config_file:
+        json.dump(config, config_file)
+    return config_path
+
+# Function to start a command and return the seconds until the stand-in sees its first request
+def time_to_first_poll(site, command, config_path, timeout):
+    site.reset()
+    environment = {**os.environ, "ELECTION_CONFIG": config_path}
+    started_at = time.monotonic()
+    process = subprocess.Popen(command, cwd=root_dir, env=environment, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not site.first_request.wait(timeout):
+            return None
+        with site.lock:
+            return min(site.first_requests.values()) - started_at
+    finally:
+        process.terminate()
+        process.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the time from starting a monitor to its first poll of the results site.")
+    parser.add_argument("--runs", type=int, default=5, help="Starts per command")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the first poll")
+    args = parser.parse_args()
+
+    site = FirstPollSite()
+    base_url = site.start()
+    # Each monitor is stopped right after its first request, the dropped connections are expected
+    site.server.handle_error = lambda request, client_address: None
+    config_path = write_config(base_url, tempfile.mkdtemp())
+    commands = {
+        "monitor adaderana": [sys.executable, cli_path, "monitor", "adaderana"],
+        "monitor elections": [sys.executable, cli_path, "monitor", "elections"],
+        "monitor all": [sys.executable, cli_path, "monitor", "all"],
+        "python dataderana.py": [sys.executable, os.path.join(root_dir, "dataderana.py")],
+    }
+
+    failures = 0
+    print(f"{'first poll (ms)':<24}{'runs':>6}{'median':>10}{'max':>10}")
+    for label, command in commands.items():
+        timings = [time_to_first_poll(site, command, config_path, args.timeout) for _ in range(args.runs)]
+        if None in timings:
+            print(f"{label:<24}  no poll within {args.timeout}s")
+            failures += 1
+            continue
+        print(f"{label:<24}{len(timings):>6}{statistics.median(timings) * 1000:>10.0f}{max(timings) * 1000:>10.0f}")
+
+    # Importing every monitor must not pull in the GUI, COM or translation packages
+    check = ("import sys, dataderana, datamain, runner, sharded; "
+             f"print(' '.join(name for name in {gui_modules!r} if name in sys.modules))")
+    loaded = subprocess.run([sys.executable, "-c", check], cwd=root_dir, capture_output=True, text=True,
+                            env={**os.environ, "ELECTION_CONFIG": config_path}).stdout.split()
+    print(f"\nGUI/COM/translation modules loaded by the monitors: {', '.join(loaded) or 'none'}")
+    failures += bool(loaded)
+
+    site.stop()
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
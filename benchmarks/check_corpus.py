@@ -0,0 +1,71 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import corpus_dir, expected_path, extract, load_corpus
+from extractors import backends
+
+# Function to describe how an output differs from the golden one, one line per differing field
+def differences(expected, actual, path=""):
+    if isinstance(expected, dict) and isinstance(actual, dict):
+        lines = []
+        for key in list(expected) + [key for key in actual if key not in expected]:
+            lines += differences(expected.get(key), actual.get(key), f"{path}.{key}" if path else key)
+        return lines
+    if isinstance(expected, list) and isinstance(actual, list) and len(expected) == len(actual):
+        return [line for i, (old, new) in enumerate(zip(expected, actual)) for line in differences(old, new, f"{path}[{i}]")]
+    return [] if expected == actual else [f"{path or '(page)'}: expected {expected!r}, got {actual!r}"]
+
+# Function to write the golden files from the reference backend
+def update_goldens(directory, reference, pages):
+    for kind, name, html, expected in pages:
+        actual = extract(reference, kind, html)
+        if actual == expected:
+            continue
+        with open(expected_path(directory, kind, name), "w", encoding="utf-8", newline="\n") as expected_file:
+            json.dump(actual, expected_file, ensure_ascii=False, indent=4)
+            expected_file.write("\n")
+        print(f"{'updated' if expected is not None else 'created'} {kind}/{name}.expected.json")
+
+def main():
+    parser = argparse.ArgumentParser(description="Check every extraction backend against the archived page corpus.")
+    parser.add_argument("--corpus", default=corpus_dir, help="Corpus directory with <kind>/<name>.html pages")
+    parser.add_argument("--backend", action="append", help="Backend to check, repeatable (default: all installed)")
+    parser.add_argument("--update", action="store_true",
+                        help="Rewrite the golden files from the bs4 backend, review the change with git diff")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus)
+    if not pages:
+        print(f"[ERROR] No pages found in {args.corpus}")
+        return 1
+    if args.update:
+        update_goldens(args.corpus, backends["bs4"](), pages)
+        pages = load_corpus(args.corpus)
+
+    failures = 0
+    for name in args.backend or list(backends):
+        try:
+            backend = backends[name]()
+        except ImportError as e:
+            print(f"[WARNING] Skipping backend {name}: {e}")
+            continue
+        passed = 0
+        for kind, page, html, expected in pages:
+            if expected is None:
+                print(f"[ERROR] {name}: {kind}/{page} has no golden file, create it with --update")
+                failures += 1
+                continue
+            lines = differences(expected, extract(backend, kind, html))
+            for line in lines:
+                print(f"[ERROR] {name}: {kind}/{page}: {line}")
+            failures += bool(lines)
+            passed += not lines
+        print(f"{name}: {passed} of {len(pages)} pages match")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
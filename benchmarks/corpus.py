@@ -0,0 +1,61 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dataderana
+import datamain
+
+# Archived pages in samples/corpus/<kind>/<name>.html, each with the expected extractor output
+# in <name>.expected.json next to it. Pages the extractors must reject expect {"error": ...}.
+corpus_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples", "corpus")
+kinds = ("index", "division", "allisland")
+
+# Function to list (kind, name, html, expected) for every page, expected is None without a golden file
+def load_corpus(directory=corpus_dir):
+    pages = []
+    for kind in kinds:
+        kind_dir = os.path.join(directory, kind)
+        for file_name in sorted(os.listdir(kind_dir)) if os.path.isdir(kind_dir) else []:
+            if not file_name.endswith(".html"):
+                continue
+            name = file_name[:-len(".html")]
+            with open(os.path.join(kind_dir, file_name), "r", encoding="utf-8") as page_file:
+                html = page_file.read()
+            expected = None
+            if os.path.exists(expected_path(directory, kind, name)):
+                with open(expected_path(directory, kind, name), "r", encoding="utf-8") as expected_file:
+                    expected = json.load(expected_file)
+            pages.append((kind, name, html, expected))
+    return pages
+
+def expected_path(directory, kind, name):
+    return os.path.join(directory, kind, f"{name}.expected.json")
+
+# Function to make the extractor call the monitors make for a page kind
+def parse(backend, kind, html):
+    if kind == "index":
+        return backend.division_index_rows(html)
+    if kind == "division":
+        return backend.division_results(html, dataderana.party_map)
+    return backend.allisland_results(html, datamain.candidates)
+
+# Function to turn an extractor's output, with every party's records, into the JSON form of the golden files
+def extract(backend, kind, html):
+    try:
+        parsed = parse(backend, kind, html)
+        if kind == "division":
+            records = backend.division_records(html)[0]
+        elif kind == "allisland":
+            records = backend.allisland_records(html)[1]
+    except Exception as e:
+        return {"error": type(e).__name__}
+    if kind == "index":
+        return {"rows": [list(row) for row in parsed]}
+    *title, candidate_data, general_data = parsed
+    output = {"candidate_data": candidate_data, "general_data": general_data, "parties": records.to_list()}
+    if title:
+        output = {"title": title[0], **output}
+    # Round trip so the comparison sees exactly what the golden file holds
+    return json.loads(json.dumps(output, ensure_ascii=False))
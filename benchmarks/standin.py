@@ -0,0 +1,302 @@
+import bisect
+import collections
+import http.server
+import json
+import math
+import os
+import re
+import threading
+import time
+
+samples_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "samples")
+
+# Paths the stand-in serves, relative to its base URL
+adaderana_path = "general-election-2024/"
+allisland_path = "allisland.php"
+webhook_path = "webhook"
+
+# Function to read a recorded page
+def load_page(name, directory=samples_dir):
+    with open(os.path.join(directory, name), "r", encoding="utf-8") as page_file:
+        return page_file.read()
+
+# Function to split the recorded index page into (head, [(division, row_html)], tail)
+def split_index_rows(index_html):
+    start = index_html.index("<tbody>") + len("<tbody>")
+    end = index_html.index("</tbody>")
+    rows = []
+    for row_html in re.findall(r"\s*<tr>.*?</tr>", index_html[start:end], re.S):
+        division = re.search(r"<td>(.*?)</td>", row_html, re.S).group(1).strip()
+        rows.append((division, row_html))
+    return index_html[:start], rows, index_html[end:]
+
+# Function to build an index row for another division in the layout of a recorded row
+def index_row(template_row, division, link_id):
+    row = re.sub(r"<td>.*?</td>", f"<td>{division}</td>", template_row, count=1, flags=re.S)
+    return re.sub(r'id=[^"&]*', f"id={link_id}", row)
+
+# Function to load a recorded release timeline: {"releases": [{"division": ..., "at": seconds}, ...]}
+def load_timeline(path):
+    with open(path, "r", encoding="utf-8") as timeline_file:
+        return json.load(timeline_file)["releases"]
+
+# Function to build a timeline from a results archive, each division released when it was first scraped
+def timeline_from_archive(path, source="adaderana"):
+    from archive import read_snapshots
+
+    first_seen = {}
+    for record in read_snapshots(path, source):
+        first_seen.setdefault(record["division"], record["scraped_at"])
+    start = min(first_seen.values(), default=0)
+    return [{"division": division, "at": scraped_at - start} for division, scraped_at in first_seen.items()]
+
+# Function to pull the division name out of a webhook message like "... **adaderana.lk** **Colombo North**."
+def division_from_message(content):
+    names = re.findall(r"\*\*([^*]+)\*\*", content or "")
+    return names[-1].strip() if names else None
+
+# Function to read the message text out of a webhook request body
+def message_content(content_type, body):
+    text = body.decode("utf-8", "replace")
+    if content_type.startswith("application/json"):
+        return json.loads(text).get("content")
+    payload = re.search(r'name="payload_json"\r\n\r\n(.*?)\r\n--', text, re.S)
+    if payload:
+        return json.loads(payload.group(1)).get("content")
+    content = re.search(r'name="content"\r\n\r\n(.*?)\r\n--', text, re.S)
+    return content.group(1) if content else None
+
+# Function to read the payload_json or JSON body of a webhook request
+def request_payload(content_type, body):
+    text = body.decode("utf-8", "replace")
+    if content_type.startswith("application/json"):
+        return json.loads(text)
+    payload = re.search(r'name="payload_json"\r\n\r\n(.*?)\r\n--', text, re.S)
+    return json.loads(payload.group(1)) if payload else {}
+
+# Function to list the filenames uploaded in a multipart webhook request
+def uploaded_filenames(content_type, body):
+    if not content_type.startswith("multipart/"):
+        return []
+    return re.findall(r'filename="([^"]*)"', body.decode("utf-8", "replace"))
+
+# Function to compute a nearest-rank percentile
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered), math.ceil(q / 100 * len(ordered))) - 1)
+    return ordered[rank]
+
+# Function to summarize timings in milliseconds
+def summarize(values):
+    if not values:
+        return {"count": 0}
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) * 1000,
+        "p50": percentile(values, 50) * 1000,
+        "p90": percentile(values, 90) * 1000,
+        "p99": percentile(values, 99) * 1000,
+        "max": max(values) * 1000,
+    }
+
+# Local stand-in for adaderana.lk, results.elections.gov.lk and the Discord webhook.
+# Divisions of the recorded index are released one by one on a timeline, and every
+# webhook post is recorded with the time it arrived.
+class StandInSite:
+    def __init__(self, release_interval=1.0, directory=samples_dir, webhook_limit=None):
+        self.release_interval = release_interval
+        # (posts, seconds) the webhook accepts before answering 429 like Discord, None for no limit
+        self.webhook_limit = webhook_limit
+        self.recent_posts = collections.deque()
+        self.rate_limited = 0
+        self.index_head, self.index_rows, self.index_tail = split_index_rows(load_page("adaderana_index.html", directory))
+        self.division_page = load_page("adaderana_division.html", directory)
+        self.allisland_page = load_page("elections_allisland.html", directory)
+        self.release_times = {}
+        self.posts = []
+        self.edits = []
+        self.messages = {}
+        self.lock = threading.Lock()
+        self.started_at = None
+        self.server = None
+
+    @property
+    def divisions(self):
+        return [division for division, _ in self.index_rows]
+
+    # Starts serving and the release clock, returns the base URL
+    def start(self):
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                status, content_type, body = site.handle_get(self.path)
+                self.reply(status, content_type, body)
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, content_type, reply = site.handle_post(self.path, self.headers.get("Content-Type", ""), body)
+                self.reply(status, content_type, reply)
+
+            def do_PATCH(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                status, content_type, reply = site.handle_patch(self.path, self.headers.get("Content-Type", ""), body)
+                self.reply(status, content_type, reply)
+
+            def reply(self, status, content_type, body):
+                data = body.encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.started_at = time.monotonic()
+        return f"http://127.0.0.1:{self.server.server_port}/"
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+    # Function to revise a division: its index link changes and its page reports new numbers
+    def revise(self, division):
+        with self.lock:
+            for position, (name, row_html) in enumerate(self.index_rows):
+                if name == division:
+                    revision = int(re.search(r"rev=(\d+)", row_html).group(1)) + 1 if "rev=" in row_html else 1
+                    row_html = re.sub(r'(href="[^"]*?)(&amp;rev=\d+|&rev=\d+)?"', rf'\1&rev={revision}"', row_html, count=1)
+                    self.index_rows[position] = (name, row_html)
+
+    # Function to list the divisions released so far, recording when each first appeared
+    def released(self):
+        elapsed = time.monotonic() - self.started_at
+        count = min(len(self.index_rows), int(elapsed / self.release_interval) + 1) if self.release_interval else len(self.index_rows)
+        rows = self.index_rows[:count]
+        with self.lock:
+            for position, (division, _) in enumerate(rows):
+                self.release_times.setdefault(division, self.started_at + position * self.release_interval)
+        return rows
+
+    def handle_get(self, path):
+        path = path.lstrip("/")
+        if path.startswith(adaderana_path + "index.php"):
+            rows = self.released()
+            return 200, "text/html; charset=utf-8", self.index_head + "".join(row for _, row in rows) + self.index_tail
+        if path.startswith(adaderana_path):
+            revision = re.search(r"[?&]rev=(\d+)", path)
+            if revision:
+                # Revised pages report extra NPP votes
+                revised_votes = f"{105264 + 100 * int(revision.group(1)):,}"
+                return 200, "text/html; charset=utf-8", self.division_page.replace("105,264", revised_votes)
+            return 200, "text/html; charset=utf-8", self.division_page
+        if path.startswith(allisland_path):
+            rows = self.released()
+            if not rows:
+                return 200, "text/html; charset=utf-8", self.allisland_page
+            latest = rows[-1][0]
+            # The comment sits inside the results tables so the change is visible to the section fingerprint
+            page = self.allisland_page.replace("ALL ISLAND RESULT", latest).replace("<tbody>", f"<tbody><!-- {latest} -->", 1)
+            return 200, "text/html; charset=utf-8", page
+        return 404, "text/plain", "not found"
+
+    def handle_post(self, path, content_type, body):
+        if not path.lstrip("/").startswith(webhook_path):
+            return 404, "text/plain", "not found"
+        received_at = time.monotonic()
+        division = division_from_message(message_content(content_type, body))
+        with self.lock:
+            if self.webhook_limit:
+                posts, window = self.webhook_limit
+                while self.recent_posts and self.recent_posts[0] <= received_at - window:
+                    self.recent_posts.popleft()
+                if len(self.recent_posts) >= posts:
+                    self.rate_limited += 1
+                    retry_after = window - (received_at - self.recent_posts[0])
+                    return 429, "application/json", json.dumps({"message": "You are being rate limited.",
+                                                                "retry_after": round(retry_after, 3)})
+                self.recent_posts.append(received_at)
+            self.posts.append((received_at, division, len(body)))
+            message_id = str(len(self.posts))
+            attachments = [{"id": f"{message_id}-{i}", "filename": filename}
+                           for i, filename in enumerate(uploaded_filenames(content_type, body))]
+            self.messages[message_id] = {"id": message_id, "division": division, "attachments": attachments}
+        return 200, "application/json", json.dumps(self.messages[message_id])
+
+    # Edits a posted message: attachments listed by id are kept, uploaded files replace the rest
+    def handle_patch(self, path, content_type, body):
+        match = re.match(rf"/?{webhook_path}/messages/([^/?]+)", path)
+        message = match and self.messages.get(match.group(1))
+        if not message:
+            return 404, "application/json", json.dumps({"message": "Unknown Message", "code": 10008})
+        received_at = time.monotonic()
+        division = division_from_message(message_content(content_type, body))
+        uploaded = uploaded_filenames(content_type, body)
+        payload = request_payload(content_type, body)
+        with self.lock:
+            previous = {attachment["id"]: attachment for attachment in message["attachments"]}
+            attachments = []
+            for attachment in payload.get("attachments", []):
+                if isinstance(attachment["id"], str) and attachment["id"] in previous:
+                    attachments.append(previous[attachment["id"]])
+                else:
+                    attachments.append({"id": f"{message['id']}-{len(self.edits)}-{attachment['id']}",
+                                        "filename": attachment["filename"]})
+            message["attachments"] = attachments
+            self.edits.append((received_at, division, len(body), len(uploaded)))
+        return 200, "application/json", json.dumps(message)
+
+    # Returns (latencies in seconds, duplicate count, missing divisions)
+    def publish_report(self, expected=None):
+        expected = self.divisions if expected is None else expected
+        latencies = []
+        seen = set()
+        duplicates = 0
+        with self.lock:
+            for received_at, division, _ in self.posts:
+                if division in seen:
+                    duplicates += 1
+                    continue
+                seen.add(division)
+                if division in self.release_times:
+                    latencies.append(received_at - self.release_times[division])
+        missing = [division for division in expected if division not in seen]
+        return latencies, duplicates, missing
+
+# Stand-in that releases divisions on a recorded timeline instead of a fixed interval.
+# speedup compresses the timeline (96 plays 8 hours in 5 minutes) and multiply adds copies
+# of every division, released within spread timeline-seconds after the original.
+class ReplaySite(StandInSite):
+    def __init__(self, releases, speedup=1.0, multiply=1, spread=900.0, directory=samples_dir, webhook_limit=None):
+        super().__init__(release_interval=0, directory=directory, webhook_limit=webhook_limit)
+        template_row = self.index_rows[0][1]
+        schedule = []
+        for copy in range(multiply):
+            for position, release in enumerate(releases):
+                division = release["division"] if copy == 0 else f"{release['division']} #{copy + 1}"
+                at = (release["at"] + spread * copy / multiply) / speedup
+                schedule.append((at, division, index_row(template_row, division, f"{position}-{copy}")))
+        schedule.sort()
+        self.schedule = [at for at, _, _ in schedule]
+        self.index_rows = [(division, row) for _, division, row in schedule]
+
+    @property
+    def duration(self):
+        return self.schedule[-1] if self.schedule else 0.0
+
+    def released(self):
+        count = bisect.bisect_right(self.schedule, time.monotonic() - self.started_at)
+        rows = self.index_rows[:count]
+        with self.lock:
+            for at, (division, _) in zip(self.schedule, rows):
+                self.release_times.setdefault(division, self.started_at + at)
+        return rows
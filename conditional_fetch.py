@@ -0,0 +1,71 @@
+import hashlib
+import logging
+import requests
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Function to cut the results section (first table to last table) out of a page
+def results_section(html, start_marker="<table", end_marker="</table>"):
+    start = html.find(start_marker)
+    end = html.rfind(end_marker)
+    if start == -1 or end == -1 or end < start:
+        return html
+    return html[start:end + len(end_marker)]
+
+# Function to fingerprint the results section so ads and timestamps don't count as changes
+def section_fingerprint(html, start_marker="<table", end_marker="</table>"):
+    section = results_section(html, start_marker, end_marker)
+    return hashlib.sha1(section.encode("utf-8")).hexdigest()
+
+# Fetches pages with ETag / If-Modified-Since and returns None when nothing has changed
+class ConditionalFetcher:
+    def __init__(self, session=None, start_marker="<table", end_marker="</table>"):
+        self.session = session or requests.Session()
+        self.start_marker = start_marker
+        self.end_marker = end_marker
+        self.etags = {}
+        self.last_modified = {}
+        self.fingerprints = {}
+
+    # Function to build the validator headers for a URL
+    def conditional_headers(self, url, force=False):
+        headers = {}
+        if not force:
+            if url in self.etags:
+                headers["If-None-Match"] = self.etags[url]
+            if url in self.last_modified:
+                headers["If-Modified-Since"] = self.last_modified[url]
+        return headers
+
+    # Function to record a response's validators, returns None when the results section is unchanged
+    def accept(self, url, status_code, headers, html, force=False):
+        if status_code == 304:
+            logger.debug("%s not modified.", url)
+            return None
+
+        if "ETag" in headers:
+            self.etags[url] = headers["ETag"]
+        if "Last-Modified" in headers:
+            self.last_modified[url] = headers["Last-Modified"]
+
+        fingerprint = section_fingerprint(html, self.start_marker, self.end_marker)
+        if not force and self.fingerprints.get(url) == fingerprint:
+            logger.debug("Results section of %s unchanged.", url)
+            return None
+        self.fingerprints[url] = fingerprint
+        return html
+
+    def fetch(self, url, force=False):
+        with metrics.time("fetch"):
+            response = self.session.get(url, headers=self.conditional_headers(url, force))
+        metrics.http_status("index", response.status_code)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return self.accept(url, response.status_code, response.headers, response.text, force)
+
+    # Drop what is remembered for a URL so the next fetch is processed again
+    def forget(self, url):
+        self.etags.pop(url, None)
+        self.last_modified.pop(url, None)
+        self.fingerprints.pop(url, None)
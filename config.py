@@ -0,0 +1,62 @@
+import json
+import os
+import types
+
+# JSON file with the settings of every module, ELECTION_CONFIG points somewhere else:
+#   {"defaults": {"state_db_path": ...}, "dataderana": {"webhook_url": ..., "role_id": ...}, "datamain": {...}}
+default_config_path = "election_config.json"
+# Environment variables ELECTION_<SETTING> apply to every module, <MODULE>_<SETTING> to one
+shared_prefix = "ELECTION"
+
+_files = {}
+
+# Function to read a config file once per change, returns {} when there is none
+def load_config_file(path):
+    if not os.path.exists(path):
+        return {}
+    modified_ns = os.stat(path).st_mtime_ns
+    if path not in _files or _files[path][0] != modified_ns:
+        with open(path, "r", encoding="utf-8") as config_file:
+            _files[path] = (modified_ns, json.load(config_file))
+    return _files[path][1]
+
+# Function to convert an environment variable to the type of the setting it replaces
+def parse_env_value(value, default):
+    if isinstance(default, bool):
+        return value.strip().lower() in ("1", "true", "yes", "on")
+    if isinstance(default, int):
+        return int(value)
+    if isinstance(default, float):
+        return float(value)
+    if isinstance(default, list):
+        return json.loads(value) if value.lstrip().startswith("[") else [item.strip() for item in value.split(",") if item.strip()]
+    if isinstance(default, str):
+        return value
+    # Settings that default to None or a dict take JSON, or the plain string
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+def _is_setting(settings, name):
+    value = settings.get(name)
+    return name in settings and not name.startswith("_") and not callable(value) and not isinstance(value, types.ModuleType)
+
+# Function to override a module's settings, given as its globals(), from the config file and the
+# environment. Later sources win: the file's "defaults", the file's section for the module,
+# ELECTION_<SETTING>, then <SECTION>_<SETTING>. Unknown names in a module's own section are an error.
+def apply_config(settings, section, path=None):
+    config = load_config_file(path or os.environ.get("ELECTION_CONFIG", default_config_path))
+    for name, value in config.get("defaults", {}).items():
+        if _is_setting(settings, name):
+            settings[name] = value
+    for name, value in config.get(section, {}).items():
+        if not _is_setting(settings, name):
+            raise ValueError(f"Unknown setting {name!r} in the {section!r} section of the config file")
+        settings[name] = value
+
+    for prefix in (shared_prefix, section.upper()):
+        for name in [name for name in settings if _is_setting(settings, name)]:
+            value = os.environ.get(f"{prefix}_{name.upper()}")
+            if value is not None:
+                settings[name] = parse_env_value(value, settings[name])
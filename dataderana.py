@@ -1,14 +1,56 @@
 import json
+import functools
+import logging
 import requests
-from discord_webhook import DiscordWebhook
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from extractors import division_votes, get_backend
 import time
+from conditional_fetch import ConditionalFetcher
+from http_client import ResilientSession
+from tracking import DivisionTracker, row_signature
+from scheduler import PollScheduler
+from publish_queue import PublishQueue
+from sinks import create_publisher
+from statestore import StateStore
+from aggregation import ResultsAggregator
+from archive import ResultsArchive
+from metrics import metrics, setup_logging, start_metrics_server
+from config import apply_config
 
 # Configuration
 website_url = "https://election.adaderana.lk/general-election-2024/index.php"
 base_url = "https://election.adaderana.lk/general-election-2024/"
 webhook_url = ""
 role_id = ""
+# Seconds between polls of the index page, dropping to burst_interval while divisions
+# are being released and backing off up to max_poll_interval while the page is quiet
+poll_interval = 20
+burst_interval = 5
+max_poll_interval = 120
+# SQLite file that remembers handled divisions across restarts
+state_db_path = "election_state.db"
+# Append-only NDJSON log of every scraped division snapshot, read back with archive.read_snapshots
+archive_path = "results_archive.ndjson"
+# Attach running district/all-island totals and the seat projection to every division post
+publish_projection = True
+# Where each result is published: "discord", "file" (a JSON file per division in results_dir)
+# and "sse" (local Server-Sent Events push feed on sse_port)
+publish_sinks = ["discord"]
+# Edit a division's earlier Discord post when its results are revised instead of posting again
+edit_messages = True
+results_dir = "results"
+sse_port = 8765
+# Maximum number of division pages fetched in parallel
+max_concurrent_requests = 8
+# HTML extraction backend: "bs4", "lxml" or "auto"
+extraction_backend = "auto"
+# Seconds before a slow page request is raced against a second copy, None disables hedging
+hedge_after = None
+# Log level: "DEBUG" also logs every fetched URL and the JSON of every division
+log_level = "INFO"
+# Local port of the Prometheus /metrics endpoint, 0 disables it
+metrics_port = 9108
 
 # Map of site names to JSON field names
 party_map = {
@@ -20,87 +62,93 @@ party_map = {
     "MJPMinority Justice Party": "mjp_votes"
 }
 
-# Function to fetch website data
-def fetch_website_data():
+# Settings above can be overridden from election_config.json or DATADERANA_* environment variables
+apply_config(globals(), "dataderana")
+
+# Function to create a keep-alive session with a connection pool sized for the fetch workers
+def create_session(pool_size=max_concurrent_requests):
+    new_session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    new_session.mount("https://", adapter)
+    new_session.mount("http://", adapter)
+    return new_session
+
+logger = logging.getLogger(__name__)
+
+# Shared session so the index and division pages reuse pooled connections, with
+# timeouts, retries and a circuit breaker so an overloaded site can't hang the loop
+session = ResilientSession(create_session(), hedge_after=hedge_after)
+fetcher = ConditionalFetcher(session)
+extractor = get_backend(extraction_backend)
+# Discord posts are sent from a background queue so slow uploads don't stall scraping
+publisher = PublishQueue()
+# Created on first publish from publish_sinks
+result_publisher = None
+
+# Function to fetch website data, returns None when the results are unchanged
+def fetch_website_data(force=False):
     try:
-        print("[INFO] Fetching website data...")
-        response = requests.get(website_url)
-        response.raise_for_status()
-        print("[INFO] Successfully fetched website data.")
-        return response.text
+        logger.debug("Fetching website data...")
+        html = fetcher.fetch(website_url, force=force)
+        if html is not None:
+            logger.info("Successfully fetched website data.")
+        return html
     except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Request error: {e}")
+        logger.error("Request error: %s", e)
         return None
 
+# Function to extract division links with a signature of each index row
+def extract_division_index(html):
+    index = {}
+    with metrics.time("parse"):
+        for division, division_link, row_text in extractor.division_index_rows(html):
+            full_url = base_url + division_link
+            index[division] = (full_url, row_signature(row_text, division_link))
+    logger.info("Extracted %s division links.", len(index))
+    return index
+
 # Function to extract division links
 def extract_division_links(html):
-    print("[INFO] Extracting division links...")
-    soup = BeautifulSoup(html, "html.parser")
-    links = {}
-    rows = soup.select("table.table tbody tr")
-    for row in rows:
-        division = row.find("td").text.strip()
-        division_link = row.find("a", href=True)['href']
-        full_url = base_url + division_link
-        links[division] = full_url
-    print(f"[INFO] Extracted {len(links)} division links.")
-    return links
+    return {division: url for division, (url, _) in extract_division_index(html).items()}
+
+# Function to parse a division page into (candidate_data, general_data, parties), parties listing every party on the page
+def parse_division_results(html, backend=None):
+    records, general_data = (backend or extractor).division_records(html)
+    return division_votes(records, party_map), general_data, records.to_list(party_map)
 
 # Function to scrape division results
 def extract_division_results(url):
-    print(f"[INFO] Fetching results from URL: {url}")
-    response = requests.get(url)
+    logger.debug("Fetching results from URL: %s", url)
+    with metrics.time("fetch"):
+        response = session.get(url)
+    metrics.http_status("division", response.status_code)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    candidate_data = {json_key: None for json_key in party_map.values()}
-    print("[INFO] Extracting candidate data...")
-
-    # Using the CSS selector to locate results
-    result_blocks = soup.select(".card-body > .district > .dis_ele_result > .dis_ele_result_block")
-    print(f"[INFO] Found {len(result_blocks)} result blocks.")
-    
-    for result in result_blocks:
-        try:
-            result_text = result.get_text(separator="\n").strip()
-            print(f"[DEBUG] Extracted Text: {result_text}")
-            
-            lines = result_text.split("\n")
-            if len(lines) >= 4:
-                party_abbreviation = lines[0].strip()
-                party_full_name = lines[1].strip()
-                votes_text = lines[-1].strip()
-
-                full_party_name = party_abbreviation + party_full_name
-                print(f"[DEBUG] Full Party Name: {full_party_name}")
-                print(f"[DEBUG] Votes Text: {votes_text}")
-
-                if full_party_name in party_map:
-                    votes = ''.join(c for c in votes_text if c.isdigit())
-                    candidate_data[party_map[full_party_name]] = int(votes) if votes.isdigit() else None
-                    print(f"[INFO] Mapped {full_party_name} to {party_map[full_party_name]} with votes: {votes}")
-                else:
-                    print(f"[WARNING] Party not found in party_map: {full_party_name}")
-        except Exception as e:
-            print(f"[ERROR] Error processing result block: {e}")
-
-    # Extract general voting summary
-    general_data = {}
-    print("[INFO] Extracting general voting summary...")
-    try:
-        summary_table = soup.find("div", class_="total-votes-summery").find("table")
-        for row in summary_table.find_all("tr"):
-            label = row.find("th").text.strip().lower()
-            votes = int(row.find_all("td")[0].text.replace(',', ''))
-            general_data[label] = votes
-            print(f"[DEBUG] General Data: {label} = {votes}")
-    except Exception as e:
-        print(f"[ERROR] Error extracting general voting summary: {e}")
-
-    return candidate_data, general_data
-
-# Function to send JSON data to Discord
-def send_json_to_discord(division, candidate_data, general_data):
+    with metrics.time("parse"):
+        return parse_division_results(response.text)
+
+# Function to scrape several divisions in parallel, yielding results as each page completes
+def extract_all_division_results(divisions, max_workers=None):
+    max_workers = max_workers or max_concurrent_requests
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(extract_division_results, url): division for division, url in divisions.items()}
+        for future in as_completed(futures):
+            division = futures[future]
+            try:
+                yield division, future.result()
+            except Exception as e:
+                logger.error("Error fetching results for %s: %s", division, e)
+                yield division, None
+
+# Function to create the result publisher for the configured sinks once
+def get_result_publisher():
+    global result_publisher
+    if result_publisher is None:
+        result_publisher = create_publisher(publish_sinks, "adaderana", webhook_url, role_id, "adaderana.lk",
+                                            publisher, results_dir, sse_port, edit_messages)
+    return result_publisher
+
+# Function to send JSON data to Discord and every other configured sink
+def send_json_to_discord(division, candidate_data, general_data, on_sent=None, projection=None, parties=None):
     results = {
         "npp_votes": candidate_data.get("npp_votes"),
         "sjb_votes": candidate_data.get("sjb_votes"),
@@ -114,44 +162,74 @@ def send_json_to_discord(division, candidate_data, general_data):
         "rejected_votes": general_data.get("rejected"),
         "district_name": division
     }
-
-    print(f"[INFO] JSON Results for {division}: {json.dumps(results, indent=4)}")
-
-    json_file_path = f"{division}_results.json"
-    with open(json_file_path, 'w') as json_file:
-        json.dump(results, json_file, indent=4)
-
-    message = f"<@&{role_id}> election results scraped from **adaderana.lk** **{division}**."
-
-    with open(json_file_path, 'rb') as json_file:
-        webhook = DiscordWebhook(url=webhook_url, content=message)
-        webhook.add_file(file=json_file, filename=json_file_path)
-        response = webhook.execute()
-
-    if response.status_code == 200:
-        print(f"[INFO] Results for {division} sent to Discord successfully.")
+    if parties is not None:
+        results["parties"] = parties
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("JSON Results for %s: %s", division, json.dumps(results, indent=4))
+
+    get_result_publisher().publish(division, results, projection, on_sent)
+
+# Function to rebuild the running totals from the results handled before a restart
+def load_aggregator(store):
+    aggregator = ResultsAggregator()
+    for division, row in store.load("adaderana").items():
+        if row["results"]:
+            aggregator.update(division, *row["results"])
+    return aggregator
+
+# Function to archive a division's parsed results and publish them unless they were already published
+def handle_division_results(tracker, aggregator, archive, division, candidate_data, general_data, parties=None):
+    archive.append("adaderana", division, candidate_data, general_data, parties=parties)
+    if tracker.results_changed(division, candidate_data, general_data, parties):
+        fingerprint = tracker.mark_published(division, candidate_data, general_data, parties)
+        aggregator.update(division, candidate_data, general_data, parties)
+        send_json_to_discord(division, candidate_data, general_data,
+                             on_sent=functools.partial(tracker.mark_sent, division, fingerprint),
+                             projection=aggregator.summary() if publish_projection else None, parties=parties)
     else:
-        print(f"[ERROR] Failed to send results to Discord. Status code: {response.status_code}, Response: {response.text}")
+        logger.debug("Results for %s unchanged, skipping publish.", division)
 
 # Main monitoring function
 def monitor_website():
-    last_links = {}
+    start_metrics_server(metrics_port)
+    store = StateStore(state_db_path)
+    tracker = DivisionTracker(store, "adaderana")
+    publisher.use_message_store(store)
+    archive = ResultsArchive(archive_path)
+    aggregator = load_aggregator(store)
+    scheduler = PollScheduler(poll_interval, burst_interval, max_poll_interval)
+    failed = set()
     while True:
+        started_at = time.monotonic()
+        changed = False
+        session.new_cycle()
         try:
-            current_data = fetch_website_data()
+            # Refetch the full index while earlier division fetches are pending a retry
+            if failed:
+                metrics.retry("division", len(failed))
+            current_data = fetch_website_data(force=bool(failed))
             if current_data:
-                current_links = extract_division_links(current_data)
-                new_divisions = {division: url for division, url in current_links.items() if division not in last_links}
-
-                for division, url in new_divisions.items():
-                    print(f"[INFO] New data found for {division}. Fetching details...")
-                    candidate_data, general_data = extract_division_results(url)
-                    send_json_to_discord(division, candidate_data, general_data)
-
-                last_links = current_links
-            time.sleep(20)
+                index = extract_division_index(current_data)
+                changed_divisions = tracker.divisions_to_fetch(index)
+                changed = bool(changed_divisions)
+                if changed_divisions:
+                    logger.info("New or updated data found for %s divisions. Fetching details...", len(changed_divisions))
+
+                failed = set()
+                for division, results in extract_all_division_results(changed_divisions):
+                    if results is None:
+                        # Not marked as fetched so it is retried on the next poll
+                        failed.add(division)
+                        continue
+                    handle_division_results(tracker, aggregator, archive, division, *results)
+                    tracker.mark_fetched(division, index[division][1], changed_divisions[division])
         except Exception as e:
-            print(f"[ERROR] Error in monitoring loop: {e}")
+            logger.error("Error in monitoring loop: %s", e)
+            fetcher.forget(website_url)
+        scheduler.sleep(changed, started_at)
 
 # Run the monitoring script
-monitor_website()
+if __name__ == "__main__":
+    setup_logging(log_level)
+    monitor_website()
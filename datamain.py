@@ -1,64 +1,97 @@
-import json
+import functools
+import logging
 import requests
-from discord_webhook import DiscordWebhook
 import time
-from bs4 import BeautifulSoup
+from extractors import get_backend
+from conditional_fetch import ConditionalFetcher
+from http_client import ResilientSession
+from scheduler import PollScheduler
+from publish_queue import PublishQueue
+from sinks import create_publisher
+from statestore import StateStore
+from tracking import DivisionTracker
+from archive import ResultsArchive
+from metrics import metrics, setup_logging, start_metrics_server
+from config import apply_config
 
 website_url = "https://results.elections.gov.lk/allisland.php"
 # Webhook URL from your Discord server
-webhook_url = "https://discord.com/api/webhooks/1287034526006247546/TBMen9EyrkGGvKzlsGWELZCFAq0dU9VECk2tFDmZkQ8AIalg-xT7asVQvmKr0B_PZ4-7"
+webhook_url = ""
 # Discord role ID you want to ping
-role_id = "1287032549733957695"
+role_id = ""
+# Seconds between polls of the results page, dropping to burst_interval while results
+# are changing and backing off up to max_poll_interval while the page is quiet
+poll_interval = 20
+burst_interval = 5
+max_poll_interval = 120
+# SQLite file that remembers published results across restarts
+state_db_path = "election_state.db"
+# Append-only NDJSON log of every scraped snapshot, read back with archive.read_snapshots
+archive_path = "results_archive.ndjson"
+# HTML extraction backend: "bs4", "lxml" or "auto"
+extraction_backend = "auto"
+# Where each result is published: "discord", "file" (a JSON file per district in results_dir)
+# and "sse" (local Server-Sent Events push feed on sse_port, shared with dataderana in runner.py)
+publish_sinks = ["discord"]
+# Edit a division's earlier Discord post when its results are revised instead of posting again
+edit_messages = True
+results_dir = "results"
+sse_port = 8765
+# Log level: "DEBUG" also logs unchanged polls
+log_level = "INFO"
+# Local port of the Prometheus /metrics endpoint, 0 disables it
+metrics_port = 9109
 
-# Function to fetch website data
+# Map of site party names to JSON field names
+candidates = {
+    "Jathika Jana Balawegaya": "npp_votes",
+    "Samagi Jana Balawegaya": "sjb_votes",
+    "New Democratic Front": "ndf_votes",
+    "Sri Lanka Podujana Peramuna": "slpp_votes",
+    "United Democratic Voice": "uvd_votes",
+    "Sarvajana Balaya": "mjp_votes"
+}
+
+# Settings above can be overridden from election_config.json or DATAMAIN_* environment variables
+apply_config(globals(), "datamain")
+
+logger = logging.getLogger(__name__)
+
+fetcher = ConditionalFetcher(ResilientSession())
+extractor = get_backend(extraction_backend)
+# Discord posts are sent from a background queue so slow uploads don't stall scraping
+publisher = PublishQueue()
+# Created on first publish from publish_sinks
+result_publisher = None
+
+# Function to fetch website data, returns None when the results are unchanged
 def fetch_website_data():
     try:
-        response = requests.get(website_url)
-        response.raise_for_status()
-        return response.text
+        return fetcher.fetch(website_url)
     except requests.exceptions.RequestException as e:
-        print(f"Request error occurred: {e}")
+        logger.error("Request error occurred: %s", e)
         return None
 
+# Function to parse the all-island page into (title, candidate_data, general_data, parties), parties listing every party
+def parse_results(html, backend=None):
+    title, records, general_data = (backend or extractor).allisland_records(html)
+    return title, records.votes_by(candidates), general_data, records.to_list(candidates)
+
 # Function to extract the relevant data
 def extract_relevant_data(html):
-    soup = BeautifulSoup(html, "html.parser")
-    
-    title = soup.find("h4", class_="card-title card-title-dash").text.strip()
-    
-    # Updated candidates mapping
-    candidates = {
-        "Jathika Jana Balawegaya": "npp_votes",
-        "Samagi Jana Balawegaya": "sjb_votes",
-        "New Democratic Front": "ndf_votes",
-        "Sri Lanka Podujana Peramuna": "slpp_votes",
-        "United Democratic Voice": "uvd_votes",
-        "Sarvajana Balaya": "mjp_votes"
-    }
+    with metrics.time("parse"):
+        return parse_results(html)
+
+# Function to create the result publisher for the configured sinks once
+def get_result_publisher():
+    global result_publisher
+    if result_publisher is None:
+        result_publisher = create_publisher(publish_sinks, "elections.gov.lk", webhook_url, role_id,
+                                            "results.elections.gov.lk", publisher, results_dir, sse_port, edit_messages)
+    return result_publisher
 
-    candidate_data = {}
-    rows = soup.find_all("tr")
-    for row in rows:
-        name_column = row.find("h6")
-        if name_column and name_column.text.strip() in candidates:
-            name = name_column.text.strip()
-            votes = int(row.find_all("td", align="right")[0].text.strip().replace(',', ''))
-            candidate_data[candidates[name]] = votes
-
-    general_data = {}
-    table = soup.find_all("table", class_="select-table")[-1]
-    rows = table.find_all("tr")
-    for row in rows:
-        title_row = row.find("p").text.strip()
-        values = row.find_all("td", align="right")
-        if values:
-            votes = values[0].text.strip().replace(',', '')
-            general_data[title_row] = {"votes": int(votes)}
-
-    return title, candidate_data, general_data
-
-# Function to send JSON data as a downloadable file
-def send_json_to_discord(district, candidate_data, general_data):
+# Function to send JSON data as a downloadable file, and to every other configured sink
+def send_json_to_discord(district, candidate_data, general_data, on_sent=None, parties=None):
     results = {
         "npp_votes": candidate_data.get("npp_votes"),
         "sjb_votes": candidate_data.get("sjb_votes"),
@@ -72,42 +105,44 @@ def send_json_to_discord(district, candidate_data, general_data):
         "rejected_votes": general_data.get("Rejected Votes", {}).get("votes"),
         "district_name": district
     }
+    if parties is not None:
+        results["parties"] = parties
 
-    # Save results to a JSON file
-    json_file_path = f"{district}_results.json"
-    with open(json_file_path, 'w') as json_file:
-        json.dump(results, json_file, indent=4)
-
-    # Prepare the message
-    message = f"<@&{role_id}> election results scraped from **results.elections.gov.lk**  **{district}**."
-    
-    # Send the message with the file
-    with open(json_file_path, 'rb') as json_file:
-        webhook = DiscordWebhook(url=webhook_url, content=message)
-        webhook.add_file(file=json_file, filename=json_file_path)
-        response = webhook.execute()
-
-    if response.status_code == 200:
-        print(f"Results for {district} sent to Discord successfully.")
-    else:
-        print(f"Failed to send results to Discord. Status code: {response.status_code}, Response: {response.text}")
+    get_result_publisher().publish(district, results, on_sent=on_sent)
 
 # Main monitoring function
 def monitor_website():
-    last_data = None
+    start_metrics_server(metrics_port)
+    scheduler = PollScheduler(poll_interval, burst_interval, max_poll_interval)
+    store = StateStore(state_db_path)
+    tracker = DivisionTracker(store, "elections.gov.lk")
+    publisher.use_message_store(store)
+    archive = ResultsArchive(archive_path)
     while True:
+        started_at = time.monotonic()
+        changed = False
+        fetcher.session.new_cycle()
         try:
             current_data = fetch_website_data()
 
-            if current_data and current_data != last_data:
-                title, candidate_data, general_data = extract_relevant_data(current_data)
-                send_json_to_discord(title, candidate_data, general_data)
-                last_data = current_data
-
-            time.sleep(20)
+            if current_data:
+                title, candidate_data, general_data, parties = extract_relevant_data(current_data)
+                archive.append("elections.gov.lk", title, candidate_data, general_data, parties=parties)
+                # Skip results that were already published, including before a restart
+                if tracker.results_changed(title, candidate_data, general_data, parties):
+                    changed = True
+                    fingerprint = tracker.mark_published(title, candidate_data, general_data, parties)
+                    send_json_to_discord(title, candidate_data, general_data,
+                                         on_sent=functools.partial(tracker.mark_sent, title, fingerprint),
+                                         parties=parties)
 
         except Exception as e:
-            print(f"Error occurred in monitoring loop: {e}")
+            logger.error("Error occurred in monitoring loop: %s", e)
+            fetcher.forget(website_url)
+
+        scheduler.sleep(changed, started_at)
 
 # Run the monitoring script
-monitor_website()
+if __name__ == "__main__":
+    setup_logging(log_level)
+    monitor_website()
@@ -0,0 +1,92 @@
+import argparse
+import os
+import sys
+
+# Single entry point for the election tools. Only the modules a subcommand needs are
+# imported, so the monitors start on servers without Photoshop, tkinter or googletrans:
+#   python election_tool.py monitor [adaderana|elections|all|images] [--workers N]
+#   python election_tool.py render
+#   python election_tool.py batch PATH... [--template T] [--output-dir D] [--workers N]
+# Settings come from election_config.json (--config), ELECTION_* and <MODULE>_* variables.
+
+monitor_sources = ("all", "adaderana", "elections", "images")
+
+# Function to run a results monitor until interrupted
+def run_monitor(args):
+    from metrics import setup_logging
+
+    if args.source == "adaderana" and args.workers:
+        import dataderana
+        import sharded
+        setup_logging(dataderana.log_level)
+        sharded.monitor_sharded(args.workers)
+    elif args.source == "adaderana":
+        import dataderana
+        setup_logging(dataderana.log_level)
+        dataderana.monitor_website()
+    elif args.source == "elections":
+        import datamain
+        setup_logging(datamain.log_level)
+        datamain.monitor_website()
+    elif args.source == "images":
+        import mainadvaced
+        setup_logging(mainadvaced.log_level)
+        mainadvaced.monitor_website()
+    else:
+        import dataderana
+        import runner
+        setup_logging(dataderana.log_level)
+        runner.monitor_all()
+    return 0
+
+# Function to render downloaded result files one at a time with prompts
+def run_render(args):
+    import main
+    main.main()
+    return 0
+
+# Function to render a set of result files without prompts
+def run_batch(args):
+    import main
+    return 0 if main.run_batch(args.paths, args.template, args.output_dir, args.workers) else 1
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="election_tool.py", description="Scrape, publish and render election results.")
+    parser.add_argument("--config", help="JSON config file (default: election_config.json, or ELECTION_CONFIG)")
+    parser.add_argument("--log-level", help="DEBUG, INFO, WARNING or ERROR, overrides the config")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    monitor = subcommands.add_parser("monitor", help="poll the results sites and publish every new result")
+    monitor.add_argument("source", nargs="?", choices=monitor_sources, default="all",
+                         help="all: adaderana.lk and results.elections.gov.lk together (default), "
+                              "images: adaderana.lk rendered to images on request")
+    monitor.add_argument("--workers", type=int, help="parse adaderana.lk divisions in this many worker processes")
+    monitor.set_defaults(handler=run_monitor)
+
+    render = subcommands.add_parser("render", help="render downloaded result files one by one, with prompts")
+    render.set_defaults(handler=run_render)
+
+    batch = subcommands.add_parser("batch", help="render many result files without prompts")
+    batch.add_argument("paths", nargs="+", metavar="PATH", help="directories or glob patterns of *_results.json files")
+    batch.add_argument("--template", help="PSD file or pillow template spec (default: found automatically)")
+    batch.add_argument("--output-dir", help="where to save the images (default: current directory)")
+    batch.add_argument("--workers", type=int, help="render processes (default: one per CPU)")
+    batch.set_defaults(handler=run_batch)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "monitor" and args.workers is not None and args.source != "adaderana":
+        build_parser().error("--workers is only supported for the adaderana monitor")
+    # Set before any monitor module is imported, they read their settings on import
+    if args.config:
+        os.environ["ELECTION_CONFIG"] = args.config
+    if args.log_level:
+        os.environ["ELECTION_LOG_LEVEL"] = args.log_level.upper()
+    try:
+        return args.handler(args)
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
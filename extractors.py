@@ -0,0 +1,259 @@
+import logging
+from conditional_fetch import results_section
+from party_results import PartyResults, parse_count, parse_percentage, parties
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+# Raised when a results page has no party results or vote summary in the expected markup, so a
+# change to the site fails the page, which is retried, instead of publishing empty results
+class ExtractionError(ValueError):
+    pass
+
+# Function to reject a page that parsed to nothing
+def _check_results(records, general_data, page):
+    if not len(records):
+        raise ExtractionError(f"No party results found on the {page} page")
+    if not general_data:
+        raise ExtractionError(f"No vote summary found on the {page} page")
+
+# Both backends parse every party into PartyResults records in one pass; division_results and
+# allisland_results derive the scrapers' fixed-key dicts from the records.
+
+# Function to derive a division's fixed-key dict, parties missing from the page are None
+def division_votes(records, party_map):
+    return {**dict.fromkeys(party_map.values()), **records.votes_by(party_map)}
+
+# Function to parse a page with BeautifulSoup, imported on first use so the lxml backend starts faster
+def _soup(html):
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(html, "html.parser")
+
+# Reference backend: full BeautifulSoup tree built with html.parser
+class SoupExtractor:
+    name = "bs4"
+
+    # Returns (division, href, row_text) for every row of the adaderana index table
+    def division_index_rows(self, html):
+        soup = _soup(html)
+        if soup.select_one("table.table") is None:
+            raise ExtractionError("No results table found on the index page")
+        rows = []
+        for row in soup.select("table.table tbody tr"):
+            division = row.find("td").text.strip()
+            division_link = row.find("a", href=True)['href']
+            rows.append((division, division_link, row.get_text(" ", strip=True)))
+        return rows
+
+    # Returns (candidate_data, general_data) from an adaderana division page
+    def division_results(self, html, party_map):
+        records, general_data = self.division_records(html)
+        return division_votes(records, party_map), general_data
+
+    # Returns (PartyResults of every party, general_data) from an adaderana division page
+    def division_records(self, html):
+        soup = _soup(html)
+
+        records = PartyResults()
+        result_blocks = soup.select(".card-body > .district > .dis_ele_result > .dis_ele_result_block")
+        for result in result_blocks:
+            if not records.append_block(list(result.stripped_strings)):
+                raise ExtractionError("Unrecognised result block on the division page")
+
+        general_data = {}
+        try:
+            summary_table = soup.find("div", class_="total-votes-summery").find("table")
+            for row in summary_table.find_all("tr"):
+                label = row.find("th").text.strip().lower()
+                votes = int(row.find_all("td")[0].text.replace(',', ''))
+                general_data[label] = votes
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            raise ExtractionError(f"Unrecognised vote summary on the division page: {e}") from e
+
+        _check_results(records, general_data, "division")
+        return records, general_data
+
+    # Returns (title, candidate_data, general_data) from the results.elections.gov.lk page
+    def allisland_results(self, html, candidates):
+        title, records, general_data = self.allisland_records(html)
+        return title, records.votes_by(candidates), general_data
+
+    # Returns (title, PartyResults of every party, general_data) from the results.elections.gov.lk page
+    def allisland_records(self, html):
+        soup = _soup(html)
+
+        try:
+            title = soup.find("h4", class_="card-title card-title-dash").text.strip()
+        except AttributeError as e:
+            raise ExtractionError("No title found on the all-island page") from e
+
+        # Party rows are the ones with a name heading, the totals table has none
+        records = PartyResults()
+        for row in soup.select("table.select-table tr"):
+            name_column = row.find("h6")
+            if name_column:
+                values = [td.text for td in row.find_all("td", align="right")]
+                _append_party_row(records, name_column.text.strip(), values)
+
+        general_data = {}
+        try:
+            table = soup.find_all("table", class_="select-table")[-1]
+            for row in table.find_all("tr"):
+                title_row = row.find("p").text.strip()
+                values = row.find_all("td", align="right")
+                if values:
+                    votes = values[0].text.strip().replace(',', '')
+                    general_data[title_row] = {"votes": int(votes)}
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            raise ExtractionError(f"Unrecognised vote summary on the all-island page: {e}") from e
+
+        _check_results(records, general_data, "all-island")
+        return title, records, general_data
+
+# Function to add a results.elections.gov.lk party row from its votes, percentage and seats cells
+def _append_party_row(records, name, values):
+    if not values:
+        return
+    votes = parse_count(values[0])
+    percentage = parse_percentage(values[1]) if len(values) > 1 else None
+    seats = parse_count(values[2]) if len(values) > 2 else None
+    records.append(parties.intern_name(name), votes, percentage, seats)
+
+# Function to build an XPath test for a class token, like the CSS ".name" selector
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+# Fast backend: libxml2 parser, precompiled XPath, and only the page sections that hold results
+class LxmlExtractor:
+    name = "lxml"
+
+    def __init__(self):
+        if lxml is None:
+            raise ImportError("The lxml extraction backend requires the lxml package.")
+        self._index_table = etree.XPath(f"//table[{_has_class('table')}]")
+        self._index_rows = etree.XPath(f"//table[{_has_class('table')}]//tbody//tr")
+        self._result_blocks = etree.XPath(
+            f"//*[{_has_class('card-body')}]/*[{_has_class('district')}]"
+            f"/*[{_has_class('dis_ele_result')}]/*[{_has_class('dis_ele_result_block')}]")
+        self._summary_div = etree.XPath(f"//div[{_has_class('total-votes-summery')}]")
+        self._title = etree.XPath("//h4[@class='card-title card-title-dash']")
+        self._party_rows = etree.XPath(f"//table[{_has_class('select-table')}]//tr[.//h6]")
+        self._select_tables = etree.XPath(f"//table[{_has_class('select-table')}]")
+
+    # Function to collect the text nodes of an element in document order, skipping comments
+    def _strings(self, element):
+        if element.text and isinstance(element.tag, str):
+            yield element.text
+        for child in element:
+            if isinstance(child.tag, str):
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    # Function to parse markup, treating an empty page like html.parser does
+    def _parse(self, html):
+        return lxml.html.document_fromstring(html if html.strip() else "<html></html>")
+
+    def _text(self, element):
+        return "".join(self._strings(element))
+
+    def _first(self, element, path):
+        found = element.xpath(path)
+        return found[0] if found else None
+
+    def division_index_rows(self, html):
+        root = self._parse(results_section(html))
+        if not self._index_table(root):
+            raise ExtractionError("No results table found on the index page")
+        rows = []
+        for row in self._index_rows(root):
+            division = self._text(self._first(row, ".//td")).strip()
+            division_link = row.xpath(".//a[@href]")[0].get("href")
+            row_text = " ".join(s.strip() for s in self._strings(row) if s.strip())
+            rows.append((division, division_link, row_text))
+        return rows
+
+    def division_results(self, html, party_map):
+        records, general_data = self.division_records(html)
+        return division_votes(records, party_map), general_data
+
+    def division_records(self, html):
+        root = self._parse(html)
+
+        records = PartyResults()
+        for result in self._result_blocks(root):
+            if not records.append_block([s.strip() for s in self._strings(result) if s.strip()]):
+                raise ExtractionError("Unrecognised result block on the division page")
+
+        general_data = {}
+        try:
+            summary_table = self._first(self._summary_div(root)[0], ".//table")
+            for row in summary_table.xpath(".//tr"):
+                label = self._text(self._first(row, ".//th")).strip().lower()
+                votes = int(self._text(row.xpath(".//td")[0]).replace(',', ''))
+                general_data[label] = votes
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            raise ExtractionError(f"Unrecognised vote summary on the division page: {e}") from e
+
+        _check_results(records, general_data, "division")
+        return records, general_data
+
+    # Function to parse only the title heading when it can be cut out of the page
+    def _title_text(self, html):
+        marker = html.find("card-title card-title-dash")
+        start = html.rfind("<h4", 0, marker)
+        end = html.find("</h4>", marker)
+        if marker != -1 and start != -1 and end != -1:
+            titles = self._title(self._parse(html[start:end + len("</h4>")]))
+            if titles:
+                return self._text(titles[0]).strip()
+        return self._text(self._title(self._parse(html))[0]).strip()
+
+    def allisland_results(self, html, candidates):
+        title, records, general_data = self.allisland_records(html)
+        return title, records.votes_by(candidates), general_data
+
+    def allisland_records(self, html):
+        try:
+            title = self._title_text(html)
+        except IndexError as e:
+            raise ExtractionError("No title found on the all-island page") from e
+        root = self._parse(results_section(html))
+
+        records = PartyResults()
+        for row in self._party_rows(root):
+            values = [self._text(td) for td in row.iterfind("td[@align='right']")]
+            _append_party_row(records, self._text(row.find(".//h6")).strip(), values)
+
+        general_data = {}
+        try:
+            table = self._select_tables(root)[-1]
+            for row in table.iter("tr"):
+                title_row = self._text(self._first(row, ".//p")).strip()
+                values = row.xpath(".//td[@align='right']")
+                if values:
+                    votes = self._text(values[0]).strip().replace(',', '')
+                    general_data[title_row] = {"votes": int(votes)}
+        except (AttributeError, IndexError, TypeError, ValueError) as e:
+            raise ExtractionError(f"Unrecognised vote summary on the all-island page: {e}") from e
+
+        _check_results(records, general_data, "all-island")
+        return title, records, general_data
+
+backends = {
+    SoupExtractor.name: SoupExtractor,
+    LxmlExtractor.name: LxmlExtractor,
+}
+
+# Function to pick an extraction backend by name, "auto" prefers lxml when it is installed
+def get_backend(name="auto"):
+    if name == "auto":
+        name = LxmlExtractor.name if lxml is not None else SoupExtractor.name
+    if name not in backends:
+        raise ValueError(f"Unknown extraction backend: {name}")
+    return backends[name]()
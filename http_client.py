@@ -0,0 +1,179 @@
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+import requests
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait for a connection and between bytes of the response
+connect_timeout = 3.05
+read_timeout = 10
+# Statuses worth retrying: the results site is overloaded or restarting
+retry_statuses = (500, 502, 503, 504)
+
+# Raised instead of sending a request while a host's circuit is open
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    pass
+
+# Retries allowed per poll cycle across all requests, so a struggling site gets a few
+# retries instead of every request in the cycle multiplying its load
+class RetryBudget:
+    def __init__(self, retries_per_cycle=10):
+        self.retries_per_cycle = retries_per_cycle
+        self.remaining = retries_per_cycle
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.remaining = self.retries_per_cycle
+
+    def take(self):
+        with self.lock:
+            if self.remaining <= 0:
+                return False
+            self.remaining -= 1
+            return True
+
+# Stops requests to a host after failure_threshold consecutive failures; after reset_timeout
+# one trial request is let through and its outcome closes or re-opens the circuit. A trial
+# that never reports back is given up after another reset_timeout so the host isn't shut out.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_started_at = None
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            now = time.monotonic()
+            if self.trial_started_at is not None and now - self.trial_started_at < self.reset_timeout:
+                return False
+            if now - self.opened_at < self.reset_timeout:
+                return False
+            self.trial_started_at = now
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_started_at = None
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.trial_started_at = None
+            if self.failures >= self.failure_threshold:
+                opened = self.opened_at is None
+                self.opened_at = time.monotonic()
+                return opened
+            return False
+
+# Drop-in for a requests.Session used by all scrapers: every request gets connect/read timeouts,
+# server errors and connection failures are retried with exponential backoff out of a shared
+# per-cycle retry budget, each host has a circuit breaker, and with hedge_after set a GET
+# still running after that many seconds is raced against a second copy of itself.
+class ResilientSession:
+    def __init__(self, session=None, timeout=None, retries=2, backoff=0.5, max_backoff=5.0, retry_budget=None,
+                 failure_threshold=5, reset_timeout=30.0, hedge_after=None, hedge_workers=8):
+        self.session = session or requests.Session()
+        self.timeout = timeout or (connect_timeout, read_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_budget = retry_budget or RetryBudget()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_after = hedge_after
+        self.hedge_workers = hedge_workers
+        self.breakers = {}
+        self.executor = None
+        self.lock = threading.Lock()
+
+    # Function to start a poll cycle, refilling the retry budget
+    def new_cycle(self):
+        self.retry_budget.reset()
+
+    def breaker(self, url):
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[host]
+
+    def get(self, url, **kwargs):
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request("POST", url, **kwargs)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False)
+        self.session.close()
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        breaker = self.breaker(url)
+        attempt = 0
+        while True:
+            if not breaker.allow():
+                metrics.increment("election_circuit_rejections_total", (("host", urlsplit(url).netloc),))
+                raise CircuitOpenError(f"Circuit open for {urlsplit(url).netloc}, not requesting {url}")
+
+            error = response = None
+            try:
+                response = self._send(method, url, kwargs)
+            except requests.exceptions.RequestException as e:
+                error = e
+            except BaseException:
+                # Anything else still ends a trial request, the circuit must not stay stuck
+                breaker.record_failure()
+                raise
+
+            if error is None and response.status_code not in retry_statuses:
+                breaker.record_success()
+                return response
+            if breaker.record_failure():
+                logger.warning("Opened circuit for %s after %s failures.", urlsplit(url).netloc, breaker.failures)
+
+            if attempt >= self.retries or not self.retry_budget.take():
+                if error is not None:
+                    raise error
+                return response
+            attempt += 1
+            metrics.retry("http")
+            delay = min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) * random.uniform(0.5, 1.0)
+            logger.debug("Retrying %s %s in %.2fs (%s).", method, url, delay, error or response.status_code)
+            time.sleep(delay)
+
+    def _send(self, method, url, kwargs):
+        if self.hedge_after is None or method != "GET":
+            return self.session.request(method, url, **kwargs)
+
+        with self.lock:
+            if self.executor is None:
+                self.executor = ThreadPoolExecutor(max_workers=self.hedge_workers)
+        first = self.executor.submit(self.session.request, method, url, **kwargs)
+        done, _ = wait([first], timeout=self.hedge_after)
+        if done:
+            return first.result()
+
+        # The slower copy can't be cancelled, it finishes in the background and is discarded
+        metrics.increment("election_hedged_requests_total")
+        second = self.executor.submit(self.session.request, method, url, **kwargs)
+        done, _ = wait([first, second], return_when=FIRST_COMPLETED)
+        winner = done.pop()
+        try:
+            return winner.result()
+        except requests.exceptions.RequestException:
+            return (second if winner is first else first).result()
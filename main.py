@@ -1,80 +1,168 @@
 import os
-import win32com.client
+import sys
 import json
+import time
+import argparse
 from glob import glob
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
-from googletrans import Translator
+from renderer import RenderCache, get_renderer, layer_values, render_many
+from translation import SinhalaTranslator, SOURCE_REMOTE
+from config import apply_config
+
+# Image backend: "photoshop" edits the PSD through COM, "pillow" draws on a flattened template
+render_backend = "photoshop"
+# Layer positions and fonts for the pillow backend
+template_spec_path = "template_spec.json"
+# Images already rendered from the same template and numbers, reused in batch mode
+render_cache_path = "render_cache.json"
+# Cache of translated names and operator corrections
+translation_cache_path = "translation_cache.json"
+
+# Settings above can be overridden from election_config.json or MAIN_* environment variables
+apply_config(globals(), "main")
+
+# Function to expand directories and glob patterns into a sorted list of result JSON files
+def collect_json_files(paths):
+    json_files = set()
+    for path in paths:
+        if os.path.isdir(path):
+            json_files.update(glob(os.path.join(path, '*_results.json')))
+        else:
+            json_files.update(glob(path))
+    return sorted(json_files)
+
+# Function to find the template without asking: the spec for pillow, the first PSD in the current directory for photoshop
+def find_template(template_path=None):
+    if template_path:
+        return template_path
+    if render_backend != "photoshop":
+        return template_spec_path
+    psd_files = glob(os.path.join(os.getcwd(), '*.psd'))
+    return psd_files[0] if psd_files else None
+
+# Function to pick an unused output path, numbering the file when another JSON file in the
+# batch already renders to the same name (e.g. two files for one district)
+def unique_output_path(output_file_path, used_paths):
+    base, extension = os.path.splitext(output_file_path)
+    candidate = output_file_path
+    number = 1
+    while os.path.normcase(candidate) in used_paths:
+        number += 1
+        candidate = f"{base} ({number}){extension}"
+    used_paths.add(os.path.normcase(candidate))
+    return candidate
+
+# Function to render every JSON file without dialogs or prompts and print a summary report.
+# Names only a remote translation knows are used as they are and listed for a later check.
+def run_batch(paths, template_path=None, output_dir=None, workers=None):
+    json_files = collect_json_files(paths)
+    if not json_files:
+        print(f"❌ No *_results.json files found in: {', '.join(paths)}")
+        return False
+
+    template_path = find_template(template_path)
+    if not template_path or not os.path.exists(template_path):
+        print(f"❌ Error: Template {template_path or '(no PSD in the current directory)'} does not exist.")
+        return False
+
+    output_dir = output_dir or os.getcwd()
+    os.makedirs(output_dir, exist_ok=True)
+    # Photoshop is a single application, so its documents are rendered one at a time
+    if render_backend == "photoshop":
+        workers = 1
+
+    translator = SinhalaTranslator(translation_cache_path)
+    render_cache = RenderCache(render_cache_path)
+    jobs = []
+    reused = []
+    failed = []
+    unverified = []
+    renamed = []
+    used_paths = set()
+    for json_file_path in json_files:
+        try:
+            with open(json_file_path, 'r', encoding='utf-8') as json_file:
+                vote_data = json.load(json_file)
+            english_district_name = vote_data.get("district_name", "")
+            district_name, source = translator.translate(english_district_name)
+            if source == SOURCE_REMOTE:
+                unverified.append((english_district_name, district_name))
+            output_file_path = os.path.join(output_dir, f"{district_name}.jpg")
+            unique_path = unique_output_path(output_file_path, used_paths)
+            if unique_path != output_file_path:
+                renamed.append((json_file_path, unique_path))
+                output_file_path = unique_path
+            values = layer_values(district_name, vote_data)
+            if render_cache.get(template_path, values) == output_file_path:
+                reused.append(output_file_path)
+            else:
+                jobs.append((values, output_file_path))
+        except Exception as e:
+            failed.append((json_file_path, str(e)))
+
+    print(f"🔄 Rendering {len(jobs)} files with the {render_backend} backend...")
+    started_at = time.perf_counter()
+    rendered = []
+    job_values = {output_file_path: values for values, output_file_path in jobs}
+    for output_file_path, saved_path, error in render_many(render_backend, template_path, jobs, workers):
+        if saved_path:
+            rendered.append(saved_path)
+            render_cache.put(template_path, job_values[output_file_path], saved_path)
+        else:
+            failed.append((output_file_path, error or "not saved"))
+    elapsed = time.perf_counter() - started_at
+
+    print(f"\n✅ Rendered {len(rendered)} of {len(json_files)} files in {elapsed:.1f}s, {len(reused)} unchanged.")
+    for path, error in failed:
+        print(f"❌ {path}: {error}")
+    for json_file_path, output_file_path in renamed:
+        print(f"⚠️ {json_file_path} renders to the same name as another file, saved as {output_file_path}")
+    for english, sinhala in unverified:
+        print(f"⚠️ Unverified translation: {english} -> {sinhala}")
+    return not failed
 
 def get_latest_json_file():
-    downloads_path = os.path.join(os.environ['USERPROFILE'], 'Downloads')
+    downloads_path = os.path.join(os.environ.get('USERPROFILE', os.path.expanduser('~')), 'Downloads')
     json_files = glob(os.path.join(downloads_path, '*.json'))
     if not json_files:
         return None
     latest_file = max(json_files, key=os.path.getctime)
     return latest_file
 
-def process_json_file(json_file_path, psd_file_path, district_name, vote_data):
+def process_json_file(json_file_path, template_path, district_name, vote_data):
     if not os.path.exists(json_file_path):
         print(f"❌ Error: The file {json_file_path} does not exist.")
         return
 
-    if not os.path.exists(psd_file_path):
-        print(f"❌ Error: The file {psd_file_path} does not exist.")
+    if not os.path.exists(template_path):
+        print(f"❌ Error: The file {template_path} does not exist.")
         return
 
-    psApp = win32com.client.Dispatch("Photoshop.Application")
-
-    jpgSaveOptions = win32com.client.Dispatch("Photoshop.JPEGSaveOptions")  
-    jpgSaveOptions.EmbedColorProfile = True
-    jpgSaveOptions.FormatOptions = 1  
-    jpgSaveOptions.Matte = 1  
-    jpgSaveOptions.Quality = 12  
-
     current_dir = os.getcwd()
 
     print("🔄 Processing the JSON file...")
 
-    try:
-        psApp.Open(psd_file_path)
-        doc = psApp.Application.ActiveDocument
-
-        for layer in doc.Layers:
-            try:
-                if hasattr(layer, 'Kind') and layer.Kind == 2:  
-                    if layer.Name in vote_data:
-                        vote_value = vote_data[layer.Name]
-                        if vote_value is None:
-                            vote_value = 0
-                        layer.TextItem.Contents = str(vote_value)
-            except Exception as e:
-                print(f"⚠️ Error updating layer {layer.Name}: {e}")
-
-        for layer in doc.Layers:
-            try:
-                if hasattr(layer, 'Kind') and layer.Kind == 2 and layer.Name == "district_name":
-                    layer.TextItem.Contents = district_name
-            except Exception as e:
-                print(f"⚠️ Error updating district name layer: {e}")
-
-        # Display specified vote details in descending order
+    # Display specified vote details in descending order and ask before saving
+    def confirm_save():
         print("\nVote details (high to low):")
         specified_keys = ['npp_votes', 'sjb_votes', 'ndf_votes', 'uvd_votes', 'slpp_votes', 'mjp_votes']
         sorted_votes = sorted(((k, v if v is not None else 0) for k, v in vote_data.items() if k in specified_keys), key=lambda item: int(item[1]), reverse=True)
         for i, (key, value) in enumerate(sorted_votes, 1):
             print(f"{i}. {key}: {value}")
 
-        confirm_save = input("\n🔄 Are you sure you want to save the file? Press 'y' to confirm: ").strip().lower()
-        if confirm_save == 'y':
-            output_file_path = os.path.join(current_dir, f"{district_name}.jpg")
-            doc.SaveAs(output_file_path, jpgSaveOptions, True)
+        return input("\n🔄 Are you sure you want to save the file? Press 'y' to confirm: ").strip().lower() == 'y'
+
+    try:
+        renderer = get_renderer(render_backend, template_path)
+        output_file_path = os.path.join(current_dir, f"{district_name}.jpg")
+        if renderer.render(layer_values(district_name, vote_data), output_file_path, confirm=confirm_save):
             print(f"✅ Saved: {output_file_path}")
-        else:
-            print("❌ Save operation cancelled.")
     except Exception as e:
         print(f"❌ Error processing the JSON file: {e}")
 
 def main():
+    from tkinter import Tk
+    from tkinter.filedialog import askopenfilename
+
     try:
         print("Welcome to the Photoshop Batch Processor!")
         
@@ -82,8 +170,10 @@ def main():
         Tk().withdraw()
         
         current_dir = os.getcwd()
-        psd_files = glob(os.path.join(current_dir, '*.psd'))
-        if psd_files:
+        if render_backend != "photoshop":
+            psd_file_path = template_spec_path
+            print(f"🔍 Using {render_backend} template spec: {psd_file_path}")
+        elif psd_files := glob(os.path.join(current_dir, '*.psd')):
             psd_file_path = psd_files[0]
             print(f"🔍 Found PSD file in current directory: {psd_file_path}")
         else:
@@ -93,7 +183,7 @@ def main():
                 print("❌ No Photoshop file selected.")
                 return
 
-        translator = Translator()
+        translator = SinhalaTranslator(translation_cache_path)
 
         while True:
             latest_json_file = get_latest_json_file()
@@ -117,14 +207,17 @@ def main():
             with open(json_file_path, 'r', encoding='utf-8') as json_file:
                 vote_data = json.load(json_file)
                 english_district_name = vote_data.get("district_name", "")
-                translated = translator.translate(english_district_name, src='en', dest='si')
-                sinhala_district_name = translated.text.replace("දිස්ත්රික්", "දිස්ත්‍රික්කය")
-                print(f"🔄 Translated district name: {sinhala_district_name}")
-                correct_translation = input(f"👉 Is this correct? (y/n): ").strip().lower()
+                sinhala_district_name, source = translator.translate(english_district_name)
+                print(f"🔄 Translated district name: {sinhala_district_name} ({source})")
+                # Dictionary and cached names are already verified, only new remote translations need a check
+                correct_translation = input(f"👉 Is this correct? (y/n): ").strip().lower() if source == SOURCE_REMOTE else 'y'
                 if correct_translation != 'y':
                     district_name = input("👉 Please enter the correct district name: ")
+                    translator.remember(english_district_name, district_name)
                 else:
                     district_name = sinhala_district_name
+                    if source == SOURCE_REMOTE:
+                        translator.remember(english_district_name, district_name)
 
             process_json_file(json_file_path, psd_file_path, district_name, vote_data)
 
@@ -137,4 +230,14 @@ def main():
         print(f"❌ An error occurred: {e}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Render election result JSON files onto the image template.")
+    parser.add_argument("--batch", nargs="+", metavar="PATH",
+                        help="directories or glob patterns of *_results.json files to render without prompts")
+    parser.add_argument("--template", help="PSD file or pillow template spec (default: found automatically)")
+    parser.add_argument("--output-dir", help="where to save the images (default: current directory)")
+    parser.add_argument("--workers", type=int, help="render processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if args.batch:
+        sys.exit(0 if run_batch(args.batch, args.template, args.output_dir, args.workers) else 1)
+    main()
@@ -1,20 +1,46 @@
 import os
 import time
 import json
+import logging
 import requests
 from glob import glob
-from googletrans import Translator
-from tkinter import Tk
-from tkinter.filedialog import askopenfilename
-from bs4 import BeautifulSoup
-import msvcrt
-import win32com.client
+from extractors import get_backend
+from conditional_fetch import ConditionalFetcher
+from http_client import ResilientSession
+from scheduler import PollScheduler
+from publish_queue import PublishQueue, WebhookMessage
+from statestore import StateStore
+from renderer import RenderCache, get_renderer, layer_values
+from translation import SinhalaTranslator, SOURCE_REMOTE
+from metrics import metrics, setup_logging, start_metrics_server
+from config import apply_config
 
 # Configuration
 webhook_url = ""
-user_id = 
+user_id = ""
 website_url = "https://election.adaderana.lk/general-election-2024/index.php"
 base_url = "https://election.adaderana.lk/general-election-2024/"
+# HTML extraction backend: "bs4", "lxml" or "auto"
+extraction_backend = "auto"
+# Image backend: "photoshop" edits the PSD through COM, "pillow" draws on a flattened template
+render_backend = "photoshop"
+# Layer positions and fonts for the pillow backend
+template_spec_path = "template_spec.json"
+# Images already rendered from the same template and numbers, reused instead of re-rendered
+render_cache_path = "render_cache.json"
+# Cache of translated names and operator corrections
+translation_cache_path = "translation_cache.json"
+# SQLite file that remembers handled divisions across restarts
+state_db_path = "election_state.db"
+# Seconds between polls, dropping to burst_interval while divisions are being released
+# and backing off up to max_poll_interval while the page is quiet
+poll_interval = 10
+burst_interval = 5
+max_poll_interval = 60
+# Log level: "DEBUG", "INFO", "WARNING" or "ERROR"
+log_level = "INFO"
+# Local port of the Prometheus /metrics endpoint, 0 disables it
+metrics_port = 9110
 
 party_map = {
     "NPPJathika Jana Balawegaya": "npp_votes",
@@ -25,189 +51,163 @@ party_map = {
     "MJPMinority Justice Party": "mjp_votes"
 }
 
+# Settings above can be overridden from election_config.json or MAINADVACED_* environment variables
+apply_config(globals(), "mainadvaced")
+
+logger = logging.getLogger(__name__)
+
+fetcher = ConditionalFetcher(ResilientSession())
+# Images are uploaded from a background queue so the next division isn't held up
+publisher = PublishQueue()
+extractor = get_backend(extraction_backend)
+
 def fetch_website_data():
     try:
-        print("[INFO] Fetching website data...")
-        response = requests.get(website_url)
-        response.raise_for_status()
-        return response.text
+        logger.info("Fetching website data...")
+        return fetcher.fetch(website_url)
     except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Request error: {e}")
+        logger.error("Request error: %s", e)
         return None
 
 def extract_division_links(html):
-    soup = BeautifulSoup(html, "html.parser")
     links = {}
-    rows = soup.select("table.table tbody tr")
-    for row in rows:
-        division = row.find("td").text.strip()
-        division_link = row.find("a", href=True)['href']
+    for division, division_link, _ in extractor.division_index_rows(html):
         full_url = base_url + division_link
         links[division] = full_url
     return links
 
 def extract_division_results(url):
-    response = requests.get(url)
+    with metrics.time("fetch"):
+        response = fetcher.session.get(url)
+    metrics.http_status("division", response.status_code)
     response.raise_for_status()
-    soup = BeautifulSoup(response.text, "html.parser")
-
-    candidate_data = {json_key: None for json_key in party_map.values()}
-
-    result_blocks = soup.select(".card-body > .district > .dis_ele_result > .dis_ele_result_block")
-    for result in result_blocks:
-        try:
-            result_text = result.get_text(separator="\n").strip()
-            lines = result_text.split("\n")
-            if len(lines) >= 4:
-                party_abbreviation = lines[0].strip()
-                party_full_name = lines[1].strip()
-                votes_text = lines[-1].strip()
-
-                full_party_name = party_abbreviation + party_full_name
-                if full_party_name in party_map:
-                    votes = ''.join(c for c in votes_text if c.isdigit())
-                    candidate_data[party_map[full_party_name]] = int(votes) if votes.isdigit() else None
-        except Exception as e:
-            print(f"[ERROR] Error processing result block: {e}")
-
-    general_data = {}
-    try:
-        summary_table = soup.find("div", class_="total-votes-summery").find("table")
-        for row in summary_table.find_all("tr"):
-            label = row.find("th").text.strip().lower()
-            votes = int(row.find_all("td")[0].text.replace(',', ''))
-            general_data[label] = votes
-    except Exception as e:
-        print(f"[ERROR] Error extracting general voting summary: {e}")
-
-    return candidate_data, general_data
+    with metrics.time("parse"):
+        return extractor.division_results(response.text, party_map)
 
-def process_json_to_image(psd_file_path, district_name, vote_data, general_data):
-    if not os.path.exists(psd_file_path):
-        print(f"❌ Error: The file {psd_file_path} does not exist.")
+def process_json_to_image(template_path, district_name, vote_data, general_data, renderer=None, render_cache=None):
+    if not os.path.exists(template_path):
+        print(f"❌ Error: The file {template_path} does not exist.")
         return
 
-    psApp = win32com.client.Dispatch("Photoshop.Application")
-    jpgSaveOptions = win32com.client.Dispatch("Photoshop.JPEGSaveOptions")
-    jpgSaveOptions.EmbedColorProfile = True
-    jpgSaveOptions.FormatOptions = 1
-    jpgSaveOptions.Matte = 1
-    jpgSaveOptions.Quality = 12
-
     current_dir = os.getcwd()
     try:
-        psApp.Open(psd_file_path)
-        doc = psApp.Application.ActiveDocument
-
-        # Update vote data layers
-        for layer in doc.Layers:
-            if hasattr(layer, 'Kind') and layer.Kind == 2:  # Text layer
-                if layer.Name in vote_data:
-                    vote_value = vote_data[layer.Name]
-                    if vote_value is None:
-                        vote_value = 0
-                    layer.TextItem.Contents = str(vote_value)
-
-        # Update district name layer
-        for layer in doc.Layers:
-            if hasattr(layer, 'Kind') and layer.Kind == 2 and layer.Name == "district_name":
-                layer.TextItem.Contents = district_name
-
-        # Update general data layers (e.g., total votes, valid votes, etc.)
-        for layer in doc.Layers:
-            if hasattr(layer, 'Kind') and layer.Kind == 2:
-                if layer.Name == "valid_votes":
-                    valid_votes = general_data.get("valid", 0)
-                    layer.TextItem.Contents = str(valid_votes)
-                elif layer.Name == "total_votes":
-                    total_votes = general_data.get("polled", 0)
-                    layer.TextItem.Contents = str(total_votes)
-                elif layer.Name == "registered_votes":
-                    registered_votes = general_data.get("electors", 0)
-                    layer.TextItem.Contents = str(registered_votes)
-                elif layer.Name == "rejected_votes":
-                    rejected_votes = general_data.get("rejected", 0)
-                    layer.TextItem.Contents = str(rejected_votes)
+        values = layer_values(district_name, vote_data, general_data)
+        if render_cache is not None and (cached_path := render_cache.get(template_path, values)):
+            print(f"♻️ {district_name} is unchanged since {cached_path}, skipping render and upload.")
+            return
 
+        renderer = renderer or get_renderer(render_backend, template_path)
         output_file_path = os.path.join(current_dir, f"{district_name}.jpg")
-        doc.SaveAs(output_file_path, jpgSaveOptions, True)
-
-        # Send the image to Discord after saving
-        send_image_to_discord(output_file_path)
+        if renderer.render(values, output_file_path):
+            if render_cache is not None:
+                render_cache.put(template_path, values, output_file_path)
+            # Send the image to Discord after saving
+            send_image_to_discord(output_file_path)
 
     except Exception as e:
         print(f"❌ Error processing image: {e}")
 
 def send_image_to_discord(image_path):
-    message = {
-        "content": f"<@{user_id}> Here is the image you requested!"
-    }
-
-    files = {
-        'file': open(image_path, 'rb')
-    }
+    content = f"<@{user_id}> Here is the image you requested!"
 
     try:
-        response = requests.post(webhook_url, data=message, files=files)
-        if response.status_code == 200:
-            print("✅ Image sent successfully to Discord!")
-        else:
-            print(f"❌ Failed to send image to Discord: {response.status_code}")
+        with open(image_path, 'rb') as image_file:
+            image_data = image_file.read()
+        # A re-rendered division edits its earlier post, the image is uploaded again only if it changed
+        image_name = os.path.basename(image_path)
+        publisher.submit(WebhookMessage(webhook_url, content, [(image_name, image_data)],
+                                        description=f"Image {image_name}", key=f"mainadvaced:{image_name}",
+                                        edit_content=f"<@{user_id}> Here is the updated image for **{os.path.splitext(image_name)[0]}**!"))
     except Exception as e:
         print(f"❌ Error sending to Discord: {e}")
-    finally:
-        files['file'].close()
 
-def monitor_website():
-    last_links = {}
-    translator = Translator()
+# Function to ask for the PSD file in a dialog, tkinter is only loaded when there is no PSD to use
+def select_psd_file():
+    from tkinter import Tk
+    from tkinter.filedialog import askopenfilename
 
     Tk().withdraw()
+    return askopenfilename(title="Select the PSD file", filetypes=[("PSD files", "*.psd")])
+
+# Function to wait for a y/n answer, a single key press on Windows and a typed line elsewhere
+def ask_yes_no(prompt):
+    print(prompt, end='', flush=True)
+    try:
+        import msvcrt
+    except ImportError:
+        msvcrt = None
+    while True:
+        key = msvcrt.getch().decode('utf-8').lower() if msvcrt else input().strip().lower()
+        if key in ['y', 'n']:
+            if msvcrt:
+                print(key)
+            return key
+
+def monitor_website():
+    start_metrics_server(metrics_port)
+    # Resume from the divisions handled before a restart
+    store = StateStore(state_db_path)
+    publisher.use_message_store(store)
+    last_links = {division: row["url"] for division, row in store.load("mainadvaced").items()}
+    translator = SinhalaTranslator(translation_cache_path)
+
     current_dir = os.getcwd()
-    psd_files = glob(os.path.join(current_dir, '*.psd'))
-    psd_file_path = psd_files[0] if psd_files else askopenfilename(title="Select the PSD file", filetypes=[("PSD files", "*.psd")])
+    if render_backend != "photoshop":
+        psd_file_path = template_spec_path
+    else:
+        psd_files = glob(os.path.join(current_dir, '*.psd'))
+        psd_file_path = psd_files[0] if psd_files else select_psd_file()
 
     if not psd_file_path:
         print("❌ No PSD file selected. Exiting.")
         return
 
+    # One renderer for the whole session keeps the PSD open between divisions
+    renderer = get_renderer(render_backend, psd_file_path)
+    render_cache = RenderCache(render_cache_path)
+    scheduler = PollScheduler(poll_interval, burst_interval, max_poll_interval)
     while True:
+        started_at = time.monotonic()
+        changed = False
+        fetcher.session.new_cycle()
         try:
             current_data = fetch_website_data()
             if current_data:
                 current_links = extract_division_links(current_data)
                 new_divisions = {division: url for division, url in current_links.items() if division not in last_links}
+                changed = bool(new_divisions)
 
                 for division, url in new_divisions.items():
-                    print(f"👉 Do you want to create an image for {division}? (y/n): ", end='', flush=True)
-                    while True:
-                        key = msvcrt.getch().decode('utf-8').lower()
-                        if key in ['y', 'n']:
-                            create_image = key
-                            print(key)
-                            break
-                    if create_image == 'n':
+                    if ask_yes_no(f"👉 Do you want to create an image for {division}? (y/n): ") == 'n':
+                        store.record_fetched("mainadvaced", division, url, None)
                         continue  # Skip to the next division
 
                     candidate_data, general_data = extract_division_results(url)
 
-                    translated = translator.translate(division, src='en', dest='si')
-                    sinhala_district_name = translated.text.replace("දිස්ත්රික්", "දිස්ත්‍රික්කය")
+                    sinhala_district_name, source = translator.translate(division)
 
-                    district_name = input(f"👉 Please enter the district name for {division}: ").strip()
-                    # correct_translation = input(f"👉 Is the translated district name '{sinhala_district_name}' correct? (y/n): ").strip().lower()
-                    # if correct_translation != 'y':
-                    #     district_name = input("👉 Please enter the correct district name: ").strip()
-                    # else:
-                    #     district_name = sinhala_district_name
+                    # Dictionary and cached names are already verified, only new remote translations need a check
+                    correct_translation = 'y'
+                    if source == SOURCE_REMOTE:
+                        correct_translation = input(f"👉 Is the translated district name '{sinhala_district_name}' correct? (y/n): ").strip().lower()
+                    if correct_translation != 'y':
+                        district_name = input("👉 Please enter the correct district name: ").strip()
+                        translator.remember(division, district_name)
+                    else:
+                        district_name = sinhala_district_name
+                        if source == SOURCE_REMOTE:
+                            translator.remember(division, district_name)
 
                     vote_data = {**candidate_data, "district_name": district_name}
-                    process_json_to_image(psd_file_path, district_name, vote_data, general_data)
+                    process_json_to_image(psd_file_path, district_name, vote_data, general_data, renderer, render_cache)
+                    store.record_fetched("mainadvaced", division, url, None)
 
                 last_links = current_links
-            time.sleep(10)
         except Exception as e:
-            print(f"[ERROR] Error in monitoring loop: {e}")
+            logger.error("Error in monitoring loop: %s", e)
+            fetcher.forget(website_url)
+        scheduler.sleep(changed, started_at)
 
 if __name__ == "__main__":
+    setup_logging(log_level)
     monitor_website()
@@ -0,0 +1,127 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds in seconds of the stage latency histogram buckets
+latency_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Function to set up leveled logging in the "[LEVEL] message" format the scripts always printed.
+# Debug messages use lazy %-formatting, so they cost one level check when disabled.
+def setup_logging(level="INFO"):
+    logging.basicConfig(level=getattr(logging, str(level).upper(), logging.INFO),
+                        format="[%(levelname)s] %(message)s")
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in labels) + "}"
+
+# Counters and latency histograms of the scrape pipeline, rendered in the Prometheus text format
+class Metrics:
+    def __init__(self, buckets=latency_buckets):
+        self.buckets = tuple(buckets)
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+
+    # Function to add to a counter, labels is a tuple of (name, value) pairs
+    def increment(self, name, labels=(), amount=1):
+        with self.lock:
+            key = (name, tuple(labels))
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    # Function to record one duration in a stage's histogram
+    def observe(self, stage, seconds):
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self.lock:
+            counts, total = self.histograms.get(stage, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self.histograms[stage] = (counts, total + seconds)
+
+    # Context manager timing the block as one observation of a stage
+    @contextmanager
+    def time(self, stage):
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started_at)
+
+    def http_status(self, target, status_code):
+        self.increment("election_http_responses_total", (("target", target), ("code", status_code)))
+
+    def retry(self, stage, amount=1):
+        self.increment("election_retries_total", (("stage", stage),), amount)
+
+    # Function to take everything recorded so far and reset it, returns JSON-ready (counters, histograms)
+    # for another process's registry to merge
+    def drain(self):
+        with self.lock:
+            counters, histograms = self.counters, self.histograms
+            self.counters, self.histograms = {}, {}
+        return ([[name, [list(label) for label in labels], value] for (name, labels), value in counters.items()],
+                [[stage, counts, total] for stage, (counts, total) in histograms.items()])
+
+    # Function to add counters and histograms drained from another process's registry
+    def merge(self, counters, histograms):
+        for name, labels, value in counters:
+            self.increment(name, tuple(tuple(label) for label in labels), value)
+        with self.lock:
+            for stage, counts, total in histograms:
+                current, current_total = self.histograms.get(stage, ([0] * (len(self.buckets) + 1), 0.0))
+                self.histograms[stage] = ([a + b for a, b in zip(current, counts)], current_total + total)
+
+    def render(self):
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((stage, list(counts), total) for stage, (counts, total) in self.histograms.items())
+
+        lines = []
+        names = set()
+        for (name, labels), value in counters:
+            if name not in names:
+                names.add(name)
+                lines.append(f"# TYPE {name} counter")
+            lines.append(f"{name}{_label_text(labels)} {value}")
+
+        if histograms:
+            lines.append("# HELP election_stage_seconds Time spent in each pipeline stage.")
+            lines.append("# TYPE election_stage_seconds histogram")
+        for stage, counts, total in histograms:
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                lines.append(f'election_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'election_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+            lines.append(f'election_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+# Process-wide registry the scrapers, renderers and publish queue report into
+metrics = Metrics()
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+# Function to serve /metrics on a background thread; port 0 disables the endpoint
+def start_metrics_server(port, host="127.0.0.1"):
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    logging.getLogger(__name__).info("Metrics available at http://%s:%d/metrics", host, server.server_address[1])
+    return server
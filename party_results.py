@@ -0,0 +1,115 @@
+import threading
+from array import array
+
+# Codes of the parties on the results sites. adaderana.lk prints each party's code next to
+# its name, results.elections.gov.lk only the name; parties not listed here use their name.
+known_party_codes = {
+    "Jathika Jana Balawegaya": "NPP",
+    "Samagi Jana Balawegaya": "SJB",
+    "New Democratic Front": "NDF",
+    "Sri Lanka Podujana Peramuna": "SLPP",
+    "United Democratic Voice": "UDV",
+    "Minority Justice Party": "MJP",
+    "Ilankai Tamil Arasu Kachchi": "ITAK",
+    "Sarvajana Balaya": "SB",
+}
+
+# Intern table giving every party a small integer id, so records store ints instead of strings.
+# Parties are keyed by (code, name): independent groups can share a code.
+class PartyTable:
+    def __init__(self, party_codes=known_party_codes):
+        self.party_codes = dict(party_codes)
+        self.ids = {}
+        self.codes = []
+        self.names = []
+        self.lock = threading.Lock()
+
+    def intern(self, code, name):
+        key = (code, name)
+        party_id = self.ids.get(key)
+        if party_id is None:
+            with self.lock:
+                party_id = self.ids.get(key)
+                if party_id is None:
+                    party_id = len(self.codes)
+                    self.codes.append(code)
+                    self.names.append(name)
+                    self.ids[key] = party_id
+        return party_id
+
+    # Function to intern a party known only by its name
+    def intern_name(self, name):
+        return self.intern(self.party_codes.get(name, name), name)
+
+# Shared by every page parsed in a process
+parties = PartyTable()
+
+# Function to read a vote or seat count like "105,264", None when there are no digits
+def parse_count(text):
+    digits = ''.join(c for c in text if c.isdigit())
+    return int(digits) if digits else None
+
+# Function to read a percentage like "61.56%", None when it isn't a number
+def parse_percentage(text):
+    try:
+        return float(text.strip().rstrip('%'))
+    except ValueError:
+        return None
+
+# Every party's results on one page as parallel arrays: party ids from the intern table, votes,
+# percentages and seats, in page order. Missing counts are stored as -1 and missing percentages
+# as NaN; rows() and the dicts derived from the records give them back as None.
+class PartyResults:
+    __slots__ = ("table", "party_ids", "votes", "percentages", "seats")
+
+    def __init__(self, table=parties):
+        self.table = table
+        self.party_ids = array("i")
+        self.votes = array("q")
+        self.percentages = array("d")
+        self.seats = array("i")
+
+    def __len__(self):
+        return len(self.party_ids)
+
+    def append(self, party_id, votes=None, percentage=None, seats=None):
+        self.party_ids.append(party_id)
+        self.votes.append(-1 if votes is None else votes)
+        self.percentages.append(float("nan") if percentage is None else percentage)
+        self.seats.append(-1 if seats is None else seats)
+
+    # Function to add an adaderana result block from its text lines: code, name, percentage, votes
+    def append_block(self, lines):
+        if len(lines) < 3:
+            return False
+        percentage = next((parse_percentage(line) for line in lines[2:-1] if line.endswith('%')), None)
+        self.append(self.table.intern(lines[0], lines[1]), parse_count(lines[-1]), percentage)
+        return True
+
+    # Function to iterate (code, name, votes, percentage, seats) rows
+    def rows(self):
+        for party_id, votes, percentage, seats in zip(self.party_ids, self.votes, self.percentages, self.seats):
+            yield (self.table.codes[party_id], self.table.names[party_id], None if votes < 0 else votes,
+                   None if percentage != percentage else percentage, None if seats < 0 else seats)
+
+    # Function to derive a fixed-key dict like {"npp_votes": 105264} from a map of "<code><name>"
+    # or "<name>" to JSON key, the form party_map and candidates use. Other parties are left out.
+    def votes_by(self, party_map):
+        selected = {}
+        for party_id, votes in zip(self.party_ids, self.votes):
+            code, name = self.table.codes[party_id], self.table.names[party_id]
+            json_key = party_map.get(code + name) or party_map.get(name)
+            if json_key is not None:
+                selected[json_key] = None if votes < 0 else votes
+        return selected
+
+    # Function to list every party as a JSON-ready dict. With a party_map each dict also has the
+    # party's JSON key, None for parties the scrapers don't track.
+    def to_list(self, party_map=None):
+        listed = []
+        for code, name, votes, percentage, seats in self.rows():
+            party = {"code": code, "name": name, "votes": votes, "percentage": percentage, "seats": seats}
+            if party_map is not None:
+                party["key"] = party_map.get(code + name) or party_map.get(name)
+            listed.append(party)
+        return listed
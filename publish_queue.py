@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+import requests
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Function to hash an attachment so unchanged files are not uploaded again
+def attachment_digest(data):
+    return hashlib.sha1(data).hexdigest()
+
+# One webhook post built fully in memory: message text plus (filename, bytes) attachments.
+# Messages with a key edit the post previously sent for that key instead of posting again,
+# using edit_content as the text when given.
+class WebhookMessage:
+    def __init__(self, url, content, files=None, description="message", on_sent=None, key=None, edit_content=None):
+        self.url = url
+        self.content = content
+        self.files = files or []
+        self.description = description
+        self.on_sent = on_sent
+        self.key = key
+        self.edit_content = edit_content
+        self.attempts = 0
+
+    # Function to create a message with a JSON document attached
+    @classmethod
+    def with_json(cls, url, content, filename, document, description="message", on_sent=None, key=None, edit_content=None):
+        return cls(url, content, description=description, on_sent=on_sent, key=key,
+                   edit_content=edit_content).attach_json(filename, document)
+
+    # Function to attach another JSON document to the message
+    def attach_json(self, filename, document):
+        self.files.append((filename, json.dumps(document, indent=4).encode("utf-8")))
+        return self
+
+    # Posts the message, or edits the previous post {"id", "attachments": {filename: [id, digest]}}.
+    # An edit keeps attachments whose bytes are unchanged and uploads only the others.
+    def send(self, timeout, previous=None):
+        attachments = []
+        files = {}
+        for filename, data in self.files:
+            kept = previous and previous["attachments"].get(filename)
+            if kept and kept[1] == attachment_digest(data):
+                attachments.append({"id": kept[0]})
+            else:
+                attachments.append({"id": len(files), "filename": filename})
+                files[f"files[{len(files)}]"] = (filename, data)
+
+        if previous is None:
+            method, url = "POST", self.url
+            payload = {"content": self.content, "attachments": attachments}
+        else:
+            method, url = "PATCH", f"{self.url.rstrip('/')}/messages/{previous['id']}"
+            payload = {"content": self.edit_content or self.content, "attachments": attachments}
+        if not files:
+            return requests.request(method, url, params={"wait": "true"}, json=payload, timeout=timeout)
+        return requests.request(method, url, params={"wait": "true"}, data={"payload_json": json.dumps(payload)},
+                                files=files, timeout=timeout)
+
+    # Function to build what is remembered about the post from Discord's reply
+    def sent_record(self, response):
+        reply = response.json()
+        digests = {filename: attachment_digest(data) for filename, data in self.files}
+        return {
+            "id": reply["id"],
+            "attachments": {attachment["filename"]: [attachment["id"], digests.get(attachment["filename"])]
+                            for attachment in reply.get("attachments", [])},
+        }
+
+# Function to read how long Discord wants us to wait from a 429 response
+def retry_after(response, default=1.0):
+    header = response.headers.get("Retry-After")
+    if header:
+        try:
+            return float(header)
+        except ValueError:
+            pass
+    try:
+        body = response.json()
+    except ValueError:
+        return default
+    # A proxy or HTML error page can answer 429 with a JSON list, string or null
+    if not isinstance(body, dict):
+        return default
+    try:
+        return float(body.get("retry_after", default))
+    except (TypeError, ValueError):
+        return default
+
+# Background queue that posts webhook messages so the scrape loop never waits on Discord.
+# 429 responses are retried after Retry-After, server and connection errors with
+# exponential backoff, other client errors are dropped. The posts of keyed messages are
+# remembered (and saved to message_store when set) so later versions edit them in place.
+class PublishQueue:
+    def __init__(self, workers=1, max_attempts=5, backoff=1.0, max_backoff=30.0, timeout=30.0):
+        self.queue = queue.Queue()
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.sent = 0
+        self.edited = 0
+        self.failed = 0
+        self.messages = {}
+        self.message_store = None
+        self.threads = []
+        self.lock = threading.Lock()
+
+    @property
+    def depth(self):
+        return self.queue.qsize()
+
+    # Function to queue a message, starting the worker threads on first use
+    def submit(self, message):
+        with self.lock:
+            if not self.threads:
+                for _ in range(self.workers):
+                    thread = threading.Thread(target=self._work, daemon=True)
+                    thread.start()
+                    self.threads.append(thread)
+        self.queue.put(message)
+        logger.debug("Queued %s for Discord (queue depth: %d).", message.description, self.depth)
+
+    # Function to remember posts across restarts, message_store needs load_messages() and record_message(key, record)
+    def use_message_store(self, message_store):
+        with self.lock:
+            self.message_store = message_store
+            self.messages.update(message_store.load_messages())
+
+    def _remember(self, message, response):
+        try:
+            record = message.sent_record(response)
+        except (ValueError, KeyError):
+            return
+        with self.lock:
+            self.messages[message.key] = record
+            message_store = self.message_store
+        if message_store is not None:
+            # The post went out; failing to save it only means a later version is posted anew after a restart
+            try:
+                message_store.record_message(message.key, record)
+            except Exception as e:
+                logger.error("Could not save the Discord message for %s: %s", message.description, e)
+
+    # Function to wait until every queued message has been sent or dropped
+    def join(self):
+        self.queue.join()
+
+    def _work(self):
+        while True:
+            message = self.queue.get()
+            # Any error is confined to its message so the worker keeps sending the rest of the queue
+            try:
+                self._deliver(message)
+            except Exception as e:
+                self.failed += 1
+                metrics.increment("election_published_total", (("outcome", "dropped"),))
+                logger.error("Unexpected error sending %s to Discord, dropping it: %s", message.description, e)
+            finally:
+                self.queue.task_done()
+
+    def _deliver(self, message):
+        while message.attempts < self.max_attempts:
+            message.attempts += 1
+            if message.attempts > 1:
+                metrics.retry("publish")
+            with self.lock:
+                previous = self.messages.get(message.key) if message.key is not None else None
+            try:
+                with metrics.time("publish"):
+                    response = message.send(self.timeout, previous)
+            except requests.exceptions.RequestException as e:
+                logger.error("Error sending %s to Discord: %s", message.description, e)
+                self._sleep_backoff(message)
+                continue
+
+            metrics.http_status("discord", response.status_code)
+            if previous is not None and response.status_code == 404:
+                # The earlier post was deleted, send this one as a new post
+                logger.warning("Message for %s no longer exists, posting it again.", message.description)
+                with self.lock:
+                    self.messages.pop(message.key, None)
+                message.attempts -= 1
+                continue
+            if response.status_code in (200, 204):
+                if message.key is not None:
+                    self._remember(message, response)
+                if previous is not None:
+                    self.edited += 1
+                    metrics.increment("election_published_total", (("outcome", "edited"),))
+                    logger.info("%s edited on Discord successfully (queue depth: %s).", message.description, self.depth)
+                else:
+                    self.sent += 1
+                    metrics.increment("election_published_total", (("outcome", "sent"),))
+                    logger.info("%s sent to Discord successfully (queue depth: %s).", message.description, self.depth)
+                if message.on_sent is not None:
+                    try:
+                        message.on_sent()
+                    except Exception as e:
+                        logger.error("%s was sent but recording it failed: %s", message.description, e)
+                return
+            if response.status_code == 429:
+                wait = retry_after(response)
+                logger.warning("Discord rate limited %s, retrying in %.2fs.", message.description, wait)
+                time.sleep(wait)
+                continue
+            if response.status_code >= 500:
+                logger.error("Discord returned %s for %s, retrying.", response.status_code, message.description)
+                self._sleep_backoff(message)
+                continue
+
+            logger.error("Failed to send %s to Discord. Status code: %s, Response: %s", message.description, response.status_code, response.text)
+            break
+
+        self.failed += 1
+        metrics.increment("election_published_total", (("outcome", "dropped"),))
+        logger.error("Dropped %s after %s attempts.", message.description, message.attempts)
+
+    def _sleep_backoff(self, message):
+        if message.attempts < self.max_attempts:
+            time.sleep(min(self.max_backoff, self.backoff * 2 ** (message.attempts - 1)))
@@ -0,0 +1,251 @@
+import functools
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from metrics import metrics
+
+# Layers filled from general_data and the general_data key each one reads
+general_layers = {
+    "valid_votes": "valid",
+    "total_votes": "polled",
+    "registered_votes": "electors",
+    "rejected_votes": "rejected",
+}
+
+# Function to build the text for every template layer, missing numbers render as 0
+def layer_values(district_name, vote_data, general_data=None):
+    values = {name: str(0 if value is None else value) for name, value in vote_data.items()}
+    for layer_name, key in general_layers.items():
+        if general_data is not None:
+            values[layer_name] = str(general_data.get(key, 0))
+    values["district_name"] = district_name
+    return values
+
+# Photoshop backend: opens the PSD through COM, edits the text layers and saves a JPEG copy.
+# Only works on Windows with Photoshop installed. Every COM call is a slow round trip to
+# Photoshop, so the document stays open between renders, its text layers are indexed by
+# name in a single pass and only layers whose text changed are written.
+# app can be any object with Open(path) returning a document, e.g. a fake for testing.
+class PhotoshopRenderer:
+    name = "photoshop"
+
+    def __init__(self, psd_file_path, app=None, save_options=None):
+        self.template_path = psd_file_path
+        self.app = app
+        self.save_options = save_options
+        self.document = None
+        self.layer_index = {}
+        self.contents = {}
+
+    def _open(self):
+        if self.app is None:
+            import win32com.client
+            self.app = win32com.client.Dispatch("Photoshop.Application")
+        if self.save_options is None:
+            import win32com.client
+            self.save_options = win32com.client.Dispatch("Photoshop.JPEGSaveOptions")
+            self.save_options.EmbedColorProfile = True
+            self.save_options.FormatOptions = 1
+            self.save_options.Matte = 1
+            self.save_options.Quality = 12
+
+        self.document = self.app.Open(self.template_path)
+        self.layer_index = {}
+        self.contents = {}
+        for layer in self.document.Layers:
+            if getattr(layer, 'Kind', None) == 2:  # Text layer
+                self.layer_index[layer.Name] = layer
+
+    def _apply(self, values):
+        for layer_name, text in values.items():
+            layer = self.layer_index.get(layer_name)
+            if layer is None or self.contents.get(layer_name) == text:
+                continue
+            try:
+                layer.TextItem.Contents = text
+                self.contents[layer_name] = text
+            except Exception as e:
+                print(f"⚠️ Error updating layer {layer_name}: {e}")
+
+    def render(self, values, output_file_path, confirm=None):
+        with metrics.time("render"):
+            return self._render(values, output_file_path, confirm)
+
+    def _render(self, values, output_file_path, confirm=None):
+        if not os.path.exists(self.template_path):
+            print(f"❌ Error: The file {self.template_path} does not exist.")
+            return None
+
+        try:
+            self.document.Name
+        except Exception:
+            # Not opened yet, or closed in Photoshop since the last render
+            self._open()
+        self._apply(values)
+
+        if confirm is not None and not confirm():
+            print("❌ Save operation cancelled.")
+            return None
+
+        self.document.SaveAs(output_file_path, self.save_options, True)
+        return output_file_path
+
+# Function to decode a template image once per process
+@functools.lru_cache(maxsize=8)
+def _load_template(image_path):
+    from PIL import Image
+    with Image.open(image_path) as image:
+        return image.convert("RGB")
+
+# Function to load a font once per process
+@functools.lru_cache(maxsize=64)
+def _load_font(font_path, size):
+    from PIL import ImageFont
+    if font_path:
+        return ImageFont.truetype(font_path, size)
+    return ImageFont.load_default(size)
+
+# Pure-Python backend: draws the layer values onto a flattened template image.
+# The spec is a JSON file like template_spec.example.json:
+#   {"template": "template.png", "quality": 95,
+#    "layers": {"npp_votes": {"position": [x, y], "font": "fonts/Font.ttf", "size": 48,
+#                             "color": "#ffffff", "anchor": "ra"}, ...}}
+# Paths in the spec are relative to the spec file.
+class TemplateRenderer:
+    name = "pillow"
+
+    def __init__(self, spec_path):
+        self.template_path = spec_path
+        with open(spec_path, "r", encoding="utf-8") as spec_file:
+            self.spec = json.load(spec_file)
+        base_dir = os.path.dirname(os.path.abspath(spec_path))
+        self.image_path = os.path.join(base_dir, self.spec["template"])
+        self.layers = {}
+        for layer_name, layer in self.spec["layers"].items():
+            font_path = os.path.join(base_dir, layer["font"]) if layer.get("font") else None
+            self.layers[layer_name] = (tuple(layer["position"]), font_path, layer.get("size", 32),
+                                       layer.get("color", "#000000"), layer.get("anchor", "la"))
+
+    def render(self, values, output_file_path, confirm=None):
+        with metrics.time("render"):
+            return self._render(values, output_file_path, confirm)
+
+    def _render(self, values, output_file_path, confirm=None):
+        from PIL import ImageDraw
+
+        image = _load_template(self.image_path).copy()
+        draw = ImageDraw.Draw(image)
+        for layer_name, (position, font_path, size, color, anchor) in self.layers.items():
+            if layer_name in values:
+                draw.text(position, values[layer_name], font=_load_font(font_path, size), fill=color, anchor=anchor)
+
+        if confirm is not None and not confirm():
+            print("❌ Save operation cancelled.")
+            return None
+
+        image.save(output_file_path, "JPEG", quality=self.spec.get("quality", 95))
+        return output_file_path
+
+# Function to hash a file's bytes
+def _hash_file(path):
+    digest = hashlib.sha1()
+    with open(path, "rb") as hashed_file:
+        for block in iter(lambda: hashed_file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Function to hash a template file, reusing the hash until the file changes
+@functools.lru_cache(maxsize=64)
+def _cached_file_digest(path, modified_ns, size):
+    return _hash_file(path)
+
+def _file_digest(path):
+    stat = os.stat(path)
+    return _cached_file_digest(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+
+# Function to list the files an image depends on: the PSD, or a pillow spec with its template image and fonts
+def _template_files(template_path):
+    if not template_path.lower().endswith(".json"):
+        return [template_path]
+    with open(template_path, "r", encoding="utf-8") as spec_file:
+        spec = json.load(spec_file)
+    base_dir = os.path.dirname(os.path.abspath(template_path))
+    fonts = sorted({layer["font"] for layer in spec.get("layers", {}).values() if layer.get("font")})
+    return [template_path] + [os.path.join(base_dir, name) for name in [spec["template"]] + fonts]
+
+# Remembers which JPEG was rendered from each template + layer values, so unchanged
+# results reuse the existing image instead of being rendered and uploaded again.
+# Entries keep the digest of the saved JPEG, a file since overwritten by other numbers is not reused.
+class RenderCache:
+    def __init__(self, path="render_cache.json"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as cache_file:
+                self.entries = json.load(cache_file)
+
+    def key(self, template_path, values):
+        payload = json.dumps(values, sort_keys=True, ensure_ascii=False)
+        template_digest = ":".join(_file_digest(path) for path in _template_files(template_path))
+        return hashlib.sha1(f"{template_digest}:{payload}".encode("utf-8")).hexdigest()
+
+    # Returns the JPEG already rendered from these inputs, None if it is gone or now holds another render
+    def get(self, template_path, values):
+        with self.lock:
+            entry = self.entries.get(self.key(template_path, values))
+        if not isinstance(entry, dict) or not os.path.exists(entry["path"]):
+            return None
+        # Outputs are hashed every time, a re-render can leave the same size and timestamp
+        if _hash_file(entry["path"]) != entry["digest"]:
+            return None
+        return entry["path"]
+
+    def put(self, template_path, values, output_file_path):
+        entry = {"path": output_file_path, "digest": _hash_file(output_file_path)}
+        with self.lock:
+            self.entries[self.key(template_path, values)] = entry
+            temporary_path = f"{self.path}.tmp"
+            with open(temporary_path, "w", encoding="utf-8") as cache_file:
+                json.dump(self.entries, cache_file, ensure_ascii=False, indent=4)
+            os.replace(temporary_path, self.path)
+
+renderers = {
+    PhotoshopRenderer.name: PhotoshopRenderer,
+    TemplateRenderer.name: TemplateRenderer,
+}
+
+# Function to create a renderer; the template is a PSD for photoshop and a spec JSON for pillow
+def get_renderer(name, template_path):
+    if name not in renderers:
+        raise ValueError(f"Unknown render backend: {name}")
+    return renderers[name](template_path)
+
+# Renderer of the current worker process, created once by the pool initializer
+_worker_renderer = None
+
+def _init_worker(name, template_path):
+    global _worker_renderer
+    _worker_renderer = get_renderer(name, template_path)
+
+# Returns (output path, saved path, error, seconds); the time is reported back because
+# the worker's own metrics registry is not the one the endpoint serves
+def _render_job(job):
+    values, output_file_path = job
+    started_at = time.perf_counter()
+    try:
+        saved_path, error = _worker_renderer._render(values, output_file_path), None
+    except Exception as e:
+        saved_path, error = None, str(e)
+    return output_file_path, saved_path, error, time.perf_counter() - started_at
+
+# Function to render many divisions at once in a process pool.
+# jobs is a list of (layer values, output path); yields (output path, saved path, error) as each finishes.
+def render_many(name, template_path, jobs, workers=None):
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(name, template_path)) as pool:
+        for output_file_path, saved_path, error, seconds in pool.map(_render_job, jobs):
+            metrics.observe("render", seconds)
+            yield output_file_path, saved_path, error
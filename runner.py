@@ -0,0 +1,230 @@
+import abc
+import asyncio
+import functools
+import logging
+import time
+import requests
+import dataderana
+import datamain
+from conditional_fetch import ConditionalFetcher
+from http_client import CircuitOpenError, ResilientSession, connect_timeout, read_timeout
+from extractors import get_backend
+from scheduler import PollScheduler
+from statestore import StateStore
+from aggregation import ResultsAggregator
+from archive import ResultsArchive
+from tracking import DivisionTracker, row_signature
+from metrics import metrics, setup_logging, start_metrics_server
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Maximum number of open connections shared by all sources
+max_connections = 16
+
+logger = logging.getLogger(__name__)
+
+# Non-blocking HTTP client, uses aiohttp when installed and a requests session on worker threads otherwise.
+# Both have connect/read timeouts and share the per-host circuit breakers of http_client; failed
+# requests are not retried here since the sources fetch them again on the next poll.
+class AsyncHttp:
+    def __init__(self, limit=max_connections):
+        self.limit = limit
+        self.session = None
+        self.resilient = None
+
+    async def __aenter__(self):
+        self.resilient = ResilientSession(dataderana.create_session(self.limit), retries=0)
+        if aiohttp is not None:
+            timeout = aiohttp.ClientTimeout(sock_connect=connect_timeout, sock_read=read_timeout)
+            self.session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.limit), timeout=timeout)
+        else:
+            self.session = self.resilient
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if aiohttp is not None:
+            await self.session.close()
+        self.resilient.close()
+
+    # Returns (status_code, headers, text), raising for HTTP errors other than 304
+    async def get(self, url, headers=None, target="division"):
+        started_at = time.perf_counter()
+        if aiohttp is not None:
+            breaker = self.resilient.breaker(url)
+            if not breaker.allow():
+                raise CircuitOpenError(f"Circuit open, not requesting {url}")
+            try:
+                async with self.session.get(url, headers=headers) as response:
+                    text = await response.text()
+            except BaseException:
+                # Decoding errors and cancellation end a trial request too, not only connection errors
+                breaker.record_failure()
+                raise
+            metrics.observe("fetch", time.perf_counter() - started_at)
+            metrics.http_status(target, response.status)
+            if response.status >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if response.status >= 400:
+                raise requests.exceptions.HTTPError(f"{response.status} Error for url: {url}")
+            return response.status, response.headers, text
+
+        response = await asyncio.to_thread(self.session.get, url, headers=headers)
+        metrics.observe("fetch", time.perf_counter() - started_at)
+        metrics.http_status(target, response.status_code)
+        if response.status_code != 304:
+            response.raise_for_status()
+        return response.status_code, response.headers, response.text
+
+    # Conditional GET through a ConditionalFetcher, returns None when nothing changed
+    async def fetch(self, fetcher, url, force=False):
+        status_code, headers, text = await self.get(url, fetcher.conditional_headers(url, force), target="index")
+        return fetcher.accept(url, status_code, headers, text, force)
+
+# Base class for a polled result source, subclasses implement poll
+class SourceAdapter(abc.ABC):
+    name = "source"
+
+    def __init__(self, website_url, scheduler, archive=None):
+        self.website_url = website_url
+        self.scheduler = scheduler
+        self.fetcher = ConditionalFetcher()
+        self.archive = archive
+
+    # Function to append a parsed snapshot to the results archive, if there is one
+    def record(self, division, candidate_data, general_data, parties=None):
+        if self.archive is not None:
+            self.archive.append(self.name, division, candidate_data, general_data, parties=parties)
+
+    # Polls the source once, returns True when new results were found
+    @abc.abstractmethod
+    async def poll(self, http):
+        pass
+
+    # Runs an extractor method on a worker thread, timed as the parse stage
+    @staticmethod
+    def parse(method, *args):
+        with metrics.time("parse"):
+            return method(*args)
+
+    # Polls the source forever, a failed poll is logged and the page is processed again next time
+    async def run(self, http):
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            changed = False
+            try:
+                changed = await self.poll(http)
+            except Exception as e:
+                logger.error("[%s] Error in monitoring loop: %s", self.name, e)
+                self.fetcher.forget(self.website_url)
+            await asyncio.sleep(self.scheduler.next_delay(changed, loop.time() - started_at))
+
+# adaderana.lk: index page of released divisions plus one page per division
+class AdaderanaSource(SourceAdapter):
+    name = "adaderana"
+
+    def __init__(self, website_url=dataderana.website_url, base_url=dataderana.base_url, scheduler=None,
+                 max_concurrent_requests=dataderana.max_concurrent_requests, publish=dataderana.send_json_to_discord,
+                 store=None, archive=None):
+        scheduler = scheduler or PollScheduler(dataderana.poll_interval, dataderana.burst_interval, dataderana.max_poll_interval)
+        super().__init__(website_url, scheduler, archive)
+        self.base_url = base_url
+        self.extractor = get_backend(dataderana.extraction_backend)
+        self.tracker = DivisionTracker(store, self.name)
+        self.aggregator = ResultsAggregator()
+        if store is not None:
+            for division, row in store.load(self.name).items():
+                if row["results"]:
+                    self.aggregator.update(division, *row["results"])
+        self.failed = set()
+        self.semaphore = asyncio.Semaphore(max_concurrent_requests)
+        self.publish = publish
+
+    async def fetch_division(self, http, division, url):
+        async with self.semaphore:
+            _, _, html = await http.get(url)
+        results = await asyncio.to_thread(self.parse, dataderana.parse_division_results, html, self.extractor)
+        return division, results
+
+    async def poll(self, http):
+        if self.failed:
+            metrics.retry("division", len(self.failed))
+        html = await http.fetch(self.fetcher, self.website_url, force=bool(self.failed))
+        if html is None:
+            return False
+
+        rows = await asyncio.to_thread(self.parse, self.extractor.division_index_rows, html)
+        index = {division: (self.base_url + link, row_signature(row_text, link)) for division, link, row_text in rows}
+        changed_divisions = self.tracker.divisions_to_fetch(index)
+        if changed_divisions:
+            logger.info("[%s] New or updated data found for %s divisions.", self.name, len(changed_divisions))
+
+        self.failed = set(changed_divisions)
+        tasks = [self.fetch_division(http, division, url) for division, url in changed_divisions.items()]
+        for task in asyncio.as_completed(tasks):
+            try:
+                division, (candidate_data, general_data, parties) = await task
+            except Exception as e:
+                logger.error("[%s] Error fetching division results: %s", self.name, e)
+                continue
+            self.record(division, candidate_data, general_data, parties)
+            if self.tracker.results_changed(division, candidate_data, general_data, parties):
+                fingerprint = self.tracker.mark_published(division, candidate_data, general_data, parties)
+                self.aggregator.update(division, candidate_data, general_data, parties)
+                projection = self.aggregator.summary() if dataderana.publish_projection else None
+                await asyncio.to_thread(self.publish, division, candidate_data, general_data,
+                                        on_sent=functools.partial(self.tracker.mark_sent, division, fingerprint),
+                                        projection=projection, parties=parties)
+            self.tracker.mark_fetched(division, index[division][1], changed_divisions[division])
+            self.failed.discard(division)
+        return bool(changed_divisions)
+
+# results.elections.gov.lk: a single all-island results page
+class ElectionsSource(SourceAdapter):
+    name = "elections.gov.lk"
+
+    def __init__(self, website_url=datamain.website_url, scheduler=None, publish=datamain.send_json_to_discord,
+                 store=None, archive=None):
+        scheduler = scheduler or PollScheduler(datamain.poll_interval, datamain.burst_interval, datamain.max_poll_interval)
+        super().__init__(website_url, scheduler, archive)
+        self.extractor = get_backend(datamain.extraction_backend)
+        self.tracker = DivisionTracker(store, self.name)
+        self.publish = publish
+
+    async def poll(self, http):
+        html = await http.fetch(self.fetcher, self.website_url)
+        if html is None:
+            return False
+        title, candidate_data, general_data, parties = await asyncio.to_thread(
+            self.parse, datamain.parse_results, html, self.extractor)
+        self.record(title, candidate_data, general_data, parties)
+        if not self.tracker.results_changed(title, candidate_data, general_data, parties):
+            return False
+        fingerprint = self.tracker.mark_published(title, candidate_data, general_data, parties)
+        await asyncio.to_thread(self.publish, title, candidate_data, general_data,
+                                on_sent=functools.partial(self.tracker.mark_sent, title, fingerprint),
+                                parties=parties)
+        return True
+
+# Function to poll every source concurrently on one event loop
+async def run_sources(sources):
+    async with AsyncHttp() as http:
+        await asyncio.gather(*(source.run(http) for source in sources))
+
+# Function to watch adaderana.lk and results.elections.gov.lk from one process
+def monitor_all():
+    start_metrics_server(dataderana.metrics_port)
+    store = StateStore(dataderana.state_db_path)
+    dataderana.publisher.use_message_store(store)
+    datamain.publisher.use_message_store(store)
+    archive = ResultsArchive(dataderana.archive_path)
+    asyncio.run(run_sources([AdaderanaSource(store=store, archive=archive), ElectionsSource(store=store, archive=archive)]))
+
+if __name__ == "__main__":
+    setup_logging(dataderana.log_level)
+    monitor_all()
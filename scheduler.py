@@ -0,0 +1,34 @@
+import random
+import time
+
+# Adaptive poll timing: drops to a burst interval while results are arriving, backs off
+# towards max_interval while the page is quiet, adds jitter, and subtracts the time the
+# poll itself took from the next sleep.
+class PollScheduler:
+    def __init__(self, interval=20, burst_interval=5, max_interval=120, backoff=1.5, burst_polls=3, jitter=0.1):
+        self.interval = interval
+        self.burst_interval = min(burst_interval, interval)
+        self.max_interval = max(max_interval, interval)
+        self.backoff = backoff
+        self.burst_polls = burst_polls
+        self.jitter = jitter
+        self.current = interval
+        self.quiet_polls = 0
+
+    # Function to work out the next sleep after a poll that took `elapsed` seconds
+    def next_delay(self, changed, elapsed=0.0):
+        if changed:
+            self.current = self.burst_interval
+            self.quiet_polls = 0
+        else:
+            self.quiet_polls += 1
+            # Stay in burst mode for a few quiet polls, results tend to arrive in waves
+            if self.quiet_polls > self.burst_polls:
+                self.current = min(self.max_interval, self.current * self.backoff)
+
+        delay = self.current * (1 + random.uniform(-self.jitter, self.jitter))
+        return max(0.0, delay - elapsed)
+
+    # Function to sleep until the next poll is due
+    def sleep(self, changed, started_at):
+        time.sleep(self.next_delay(changed, time.monotonic() - started_at))
@@ -0,0 +1,135 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import time
+import dataderana
+from archive import ResultsArchive
+from extractors import get_backend
+from metrics import metrics, setup_logging, start_metrics_server
+from scheduler import PollScheduler
+from statestore import LeaseStore, StateStore
+from tracking import DivisionTracker
+from config import apply_config
+
+# Coordinator/worker mode for adaderana: the coordinator polls the index and queues every new
+# or changed division in a SQLite lease store, worker processes lease shards of divisions and
+# fetch and parse them on their own cores, and the coordinator publishes the parsed results.
+
+# Divisions a worker leases at a time
+shard_size = 8
+# Seconds before the divisions leased by a crashed or stuck worker are handed to another one
+lease_seconds = 60
+# Seconds an idle worker waits before looking for new divisions
+worker_idle_sleep = 0.1
+# Seconds between checks for parsed results while the coordinator waits for the next poll
+collect_interval = 0.05
+
+# Settings above can be overridden from election_config.json or SHARDED_* environment variables
+apply_config(globals(), "sharded")
+
+source = "adaderana"
+logger = logging.getLogger(__name__)
+
+# Worker process: leases shards of division jobs, fetches and parses them and stores the results
+def run_worker(db_path, worker_number, extraction_backend="auto", log_level="INFO"):
+    setup_logging(log_level)
+    dataderana.extractor = get_backend(extraction_backend)
+    leases = LeaseStore(db_path)
+    owner = f"{os.getpid()}-{worker_number}"
+    while True:
+        jobs = leases.lease(source, owner, shard_size, lease_seconds)
+        if not jobs:
+            time.sleep(worker_idle_sleep)
+            continue
+        # Each shard gets a fresh retry budget, like each poll of the single-process monitor
+        dataderana.session.new_cycle()
+        signatures = {division: signature for division, signature, _ in jobs}
+        urls = {division: url for division, _, url in jobs}
+        for division, results in dataderana.extract_all_division_results(urls):
+            if results is None:
+                leases.fail(source, division, signatures[division], owner)
+            elif not leases.complete(source, division, signatures[division], owner, *results):
+                logger.warning("Lease on %s expired before it was parsed, discarding the results.", division)
+        # Fetch and parse timings and HTTP statuses are reported back because the worker's own
+        # metrics registry is not the one the endpoint serves
+        leases.report_metrics(source, *metrics.drain())
+
+# Function to start worker processes, replacing any that have died
+def ensure_workers(processes, count, db_path):
+    for number in range(count):
+        process = processes.get(number)
+        if process is not None and process.is_alive():
+            continue
+        if process is not None:
+            logger.warning("Worker %s exited with code %s, starting a new one.", number, process.exitcode)
+        # Spawned rather than forked so workers never share the coordinator's sockets or threads
+        process = multiprocessing.get_context("spawn").Process(
+            target=run_worker, daemon=True, name=f"division-worker-{number}",
+            args=(db_path, number, dataderana.extraction_backend, dataderana.log_level))
+        process.start()
+        processes[number] = process
+
+# Function to add the workers' reported metrics to this process's registry
+def collect_metrics(leases):
+    for counters, histograms in leases.take_metrics(source):
+        metrics.merge(counters, histograms)
+
+# Function to publish everything the workers have parsed, returns how many divisions were handled
+def collect_parsed(leases, tracker, aggregator, archive):
+    parsed = leases.parsed(source)
+    for division, signature, url, *results in parsed:
+        dataderana.handle_division_results(tracker, aggregator, archive, division, *results)
+        tracker.mark_fetched(division, signature, url)
+        leases.finish(source, division, signature)
+    return len(parsed)
+
+# Coordinator: polls the index, queues changed divisions and publishes the workers' results
+def monitor_sharded(workers=None):
+    workers = workers or os.cpu_count() or 1
+    start_metrics_server(dataderana.metrics_port)
+    store = StateStore(dataderana.state_db_path)
+    leases = LeaseStore(dataderana.state_db_path)
+    tracker = DivisionTracker(store, source)
+    dataderana.publisher.use_message_store(store)
+    archive = ResultsArchive(dataderana.archive_path)
+    aggregator = dataderana.load_aggregator(store)
+    scheduler = PollScheduler(dataderana.poll_interval, dataderana.burst_interval, dataderana.max_poll_interval)
+    processes = {}
+    logger.info("Starting %s division workers.", workers)
+    while True:
+        ensure_workers(processes, workers, dataderana.state_db_path)
+        started_at = time.monotonic()
+        changed = False
+        dataderana.session.new_cycle()
+        try:
+            current_data = dataderana.fetch_website_data()
+            if current_data:
+                index = dataderana.extract_division_index(current_data)
+                queued = [division for division, url in tracker.divisions_to_fetch(index).items()
+                          if leases.enqueue(source, division, url, index[division][1])]
+                changed = bool(queued)
+                if queued:
+                    logger.info("Queued %s new or updated divisions for %s workers.", len(queued), workers)
+        except Exception as e:
+            logger.error("Error in monitoring loop: %s", e)
+            dataderana.fetcher.forget(dataderana.website_url)
+
+        # Publish results as the workers finish them until the next poll is due
+        deadline = time.monotonic() + scheduler.next_delay(changed, time.monotonic() - started_at)
+        while True:
+            try:
+                collect_parsed(leases, tracker, aggregator, archive)
+                collect_metrics(leases)
+            except Exception as e:
+                logger.error("Error publishing parsed divisions: %s", e)
+            if time.monotonic() >= deadline:
+                break
+            time.sleep(min(collect_interval, max(0.0, deadline - time.monotonic())))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Scrape adaderana.lk with a coordinator and parallel worker processes.")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+    setup_logging(dataderana.log_level)
+    monitor_sharded(args.workers)
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from publish_queue import WebhookMessage
+
+logger = logging.getLogger(__name__)
+
+# Discord rejects message content longer than this many characters
+discord_content_limit = 2000
+
+# Posts each result to the Discord webhook through the background publish queue.
+# on_sent is called once Discord has accepted the post. With edit_messages a revised
+# division edits its earlier post, listing only the changed fields in the text.
+class DiscordSink:
+    name = "discord"
+    confirms_delivery = True
+
+    def __init__(self, webhook_url, role_id, site, publisher, edit_messages=True):
+        self.webhook_url = webhook_url
+        self.role_id = role_id
+        self.site = site
+        self.publisher = publisher
+        self.edit_messages = edit_messages
+        self.previous = {}
+
+    def publish(self, source, division, results, projection=None, on_sent=None):
+        message = f"<@&{self.role_id}> election results scraped from **{self.site}** **{division}**."
+        key = edit_content = None
+        if self.edit_messages:
+            key = f"{source}:{division}"
+            if key in self.previous:
+                changes = result_changes(self.previous[key], results)
+                changed_fields = ", ".join(f"{field}: {old} → {new}" for field, (old, new) in changes.items())
+                edit_content = self._edit_content(changed_fields, division)
+            self.previous[key] = results
+        webhook_message = WebhookMessage.with_json(self.webhook_url, message, f"{division}_results.json", results,
+                                                   description=f"Results for {division}", on_sent=on_sent,
+                                                   key=key, edit_content=edit_content)
+        if projection is not None:
+            webhook_message.attach_json("seat_projection.json", projection)
+        self.publisher.submit(webhook_message)
+
+    # Function to build the text of an edited post, shortening the changed fields to fit Discord's limit
+    def _edit_content(self, changed_fields, division):
+        prefix, suffix = f"Updated election results from **{self.site}** (", f") **{division}**."
+        room = discord_content_limit - len(prefix) - len(suffix)
+        if len(changed_fields) > room:
+            changed_fields = changed_fields[:max(0, room - 1)] + "…"
+        return prefix + changed_fields + suffix
+
+# Writes each result to {division}_results.json in a directory, replacing the previous version
+class FileSink:
+    name = "file"
+    confirms_delivery = False
+
+    def __init__(self, directory="results"):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _write(self, filename, document):
+        path = os.path.join(self.directory, filename)
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as result_file:
+            json.dump(document, result_file, ensure_ascii=False, indent=4)
+        os.replace(temporary_path, path)
+
+    def publish(self, source, division, results, projection=None, on_sent=None):
+        self._write(f"{division}_results.json", results)
+        if projection is not None:
+            self._write("seat_projection.json", projection)
+
+# Function to read the votes of the parties a result doesn't track as {party code: votes}
+def _untracked_votes(results):
+    return {party["code"]: party["votes"] for party in results.get("parties") or () if not party.get("key")}
+
+# Function to list the fields that changed since a division's previous result as {field: [old, new]}.
+# The full parties list is left out; untracked parties whose votes changed are listed by code.
+def result_changes(previous, results):
+    previous = previous or {}
+    changes = {field: [previous.get(field), value] for field, value in results.items()
+               if field != "parties" and previous.get(field) != value}
+    old_votes, new_votes = _untracked_votes(previous), _untracked_votes(results)
+    for code in old_votes.keys() | new_votes.keys():
+        if old_votes.get(code) != new_votes.get(code):
+            changes[code] = [old_votes.get(code), new_votes.get(code)]
+    return changes
+
+class _EventStreamHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        path, _, query = self.path.partition("?")
+        sink = self.server.sink
+        if path == "/latest":
+            body = json.dumps(sink.latest_events(), ensure_ascii=False).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if path != "/events":
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+        # Late subscribers first get the latest result of every division unless they ask for ?replay=0
+        subscriber = sink.subscribe(replay="replay=0" not in query)
+        try:
+            while True:
+                try:
+                    event = subscriber.get(timeout=sink.heartbeat)
+                except queue.Empty:
+                    event = ": keep-alive\n\n"
+                self.wfile.write(event.encode("utf-8"))
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        finally:
+            sink.unsubscribe(subscriber)
+
+    def log_message(self, format, *args):
+        pass
+
+# Local Server-Sent Events feed: every result is pushed to connected subscribers as soon as
+# it is parsed, as {"source", "division", "results", "changes", "projection", "published_at"}.
+#   curl -N http://127.0.0.1:8765/events     stream of results
+#   curl http://127.0.0.1:8765/latest        latest result of every division
+class SSESink:
+    name = "sse"
+    confirms_delivery = False
+
+    def __init__(self, port=8765, host="127.0.0.1", heartbeat=15.0):
+        self.heartbeat = heartbeat
+        self.lock = threading.Lock()
+        self.subscribers = set()
+        self.latest = {}
+        self.server = ThreadingHTTPServer((host, port), _EventStreamHandler)
+        self.server.daemon_threads = True
+        self.server.sink = self
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        logger.info("Result feed available at http://%s:%d/events", host, self.server.server_address[1])
+
+    @staticmethod
+    def _format(event):
+        return f"event: result\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+    def subscribe(self, replay=True):
+        subscriber = queue.Queue()
+        with self.lock:
+            if replay:
+                for event in self.latest.values():
+                    subscriber.put(self._format(event))
+            self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+
+    def latest_events(self):
+        with self.lock:
+            return list(self.latest.values())
+
+    def publish(self, source, division, results, projection=None, on_sent=None):
+        with self.lock:
+            previous = self.latest.get((source, division))
+            event = {
+                "source": source,
+                "division": division,
+                "results": results,
+                "changes": result_changes(previous and previous["results"], results),
+                "projection": projection,
+                "published_at": time.time(),
+            }
+            self.latest[(source, division)] = event
+            formatted = self._format(event)
+            for subscriber in self.subscribers:
+                subscriber.put(formatted)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+# SSE servers by port, so sources publishing from one process share a single feed
+_sse_sinks = {}
+_sse_lock = threading.Lock()
+
+def get_sse_sink(port, host="127.0.0.1"):
+    with _sse_lock:
+        if port not in _sse_sinks:
+            _sse_sinks[port] = SSESink(port, host)
+        return _sse_sinks[port]
+
+# Sends each result to every sink; a failing sink is logged and doesn't stop the others.
+# When no sink confirms delivery (no Discord sink), on_sent is called once all sinks have run.
+# When a confirming sink fails, on_sent is not called, so the result stays unsent and is retried.
+class ResultPublisher:
+    def __init__(self, sinks, source):
+        self.sinks = list(sinks)
+        self.source = source
+
+    def publish(self, division, results, projection=None, on_sent=None):
+        confirming = any(sink.confirms_delivery for sink in self.sinks)
+        for sink in self.sinks:
+            try:
+                sink.publish(self.source, division, results, projection,
+                             on_sent=on_sent if sink.confirms_delivery else None)
+            except Exception as e:
+                logger.error("Error publishing %s to %s: %s", division, sink.name, e)
+        if not confirming and on_sent is not None:
+            on_sent()
+
+# Function to build a publisher from sink names: "discord", "file" and "sse"
+def create_publisher(names, source, webhook_url="", role_id="", site="", publish_queue=None,
+                     results_dir="results", sse_port=8765, edit_messages=True):
+    sinks = []
+    for name in names:
+        if name == DiscordSink.name:
+            sinks.append(DiscordSink(webhook_url, role_id, site, publish_queue, edit_messages))
+        elif name == FileSink.name:
+            sinks.append(FileSink(results_dir))
+        elif name == SSESink.name:
+            sinks.append(get_sse_sink(sse_port))
+        else:
+            raise ValueError(f"Unknown publish sink: {name}")
+    return ResultPublisher(sinks, source)
@@ -0,0 +1,240 @@
+import json
+import sqlite3
+import threading
+import time
+
+# Publish status of a division's latest results
+STATUS_QUEUED = "queued"
+STATUS_SENT = "sent"
+
+# Status of a division page job in the lease store
+JOB_PENDING = "pending"
+JOB_LEASED = "leased"
+JOB_PARSED = "parsed"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+# Durable record of every division a monitor has handled, so a restarted monitor
+# resumes where it stopped instead of re-fetching and re-sending everything.
+class StateStore:
+    def __init__(self, path="election_state.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS divisions (
+                source TEXT NOT NULL,
+                division TEXT NOT NULL,
+                url TEXT,
+                row_signature TEXT,
+                fingerprint TEXT,
+                results TEXT,
+                status TEXT,
+                updated_at REAL,
+                PRIMARY KEY (source, division)
+            )""")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                key TEXT PRIMARY KEY,
+                message_id TEXT,
+                attachments TEXT,
+                updated_at REAL
+            )""")
+        self.connection.commit()
+
+    def _upsert(self, source, division, **fields):
+        fields["updated_at"] = time.time()
+        columns = ", ".join(fields)
+        placeholders = ", ".join("?" for _ in fields)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in fields)
+        with self.lock:
+            self.connection.execute(
+                f"INSERT INTO divisions (source, division, {columns}) VALUES (?, ?, {placeholders}) "
+                f"ON CONFLICT (source, division) DO UPDATE SET {updates}",
+                (source, division, *fields.values()))
+            self.connection.commit()
+
+    # Returns {division: row dict} for everything recorded for a source
+    def load(self, source):
+        with self.lock:
+            cursor = self.connection.execute(
+                "SELECT division, url, row_signature, fingerprint, results, status FROM divisions WHERE source = ?",
+                (source,))
+            rows = cursor.fetchall()
+        return {
+            division: {
+                "url": url,
+                "row_signature": row_signature,
+                "fingerprint": fingerprint,
+                "results": json.loads(results) if results else None,
+                "status": status,
+            }
+            for division, url, row_signature, fingerprint, results, status in rows
+        }
+
+    # Records the index row a division's page was last fetched for
+    def record_fetched(self, source, division, url, row_signature):
+        self._upsert(source, division, url=url, row_signature=row_signature)
+
+    # Records parsed numbers that were handed to the publish queue, results are loaded back as
+    # [candidate_data, general_data] or [candidate_data, general_data, parties]
+    def record_queued(self, source, division, candidate_data, general_data, parties=None):
+        results = [candidate_data, general_data] if parties is None else [candidate_data, general_data, parties]
+        self._upsert(source, division, results=json.dumps(results), status=STATUS_QUEUED)
+
+    # Records that Discord accepted the results with this fingerprint
+    def record_sent(self, source, division, fingerprint):
+        self._upsert(source, division, fingerprint=fingerprint, status=STATUS_SENT)
+
+    # Returns {key: {"id", "attachments"}} for every Discord post that later versions should edit
+    def load_messages(self):
+        with self.lock:
+            rows = self.connection.execute("SELECT key, message_id, attachments FROM messages").fetchall()
+        return {key: {"id": message_id, "attachments": json.loads(attachments)} for key, message_id, attachments in rows}
+
+    # Records the Discord post a message key was last sent as
+    def record_message(self, key, record):
+        with self.lock:
+            self.connection.execute(
+                "INSERT INTO messages (key, message_id, attachments, updated_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET message_id = excluded.message_id, "
+                "attachments = excluded.attachments, updated_at = excluded.updated_at",
+                (key, record["id"], json.dumps(record["attachments"]), time.time()))
+            self.connection.commit()
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+# Work queue shared by the coordinator and worker processes of sharded.py. Every division
+# version (division + index row signature) is one job, so it is parsed once however often
+# it is enqueued. Workers lease jobs for lease_seconds; a crashed worker's jobs are leased
+# again once their lease runs out, and only the current lease holder can store results.
+class LeaseStore:
+    def __init__(self, path="election_state.db"):
+        self.path = path
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                source TEXT NOT NULL,
+                division TEXT NOT NULL,
+                signature TEXT NOT NULL,
+                url TEXT,
+                status TEXT,
+                owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER DEFAULT 0,
+                results TEXT,
+                updated_at REAL,
+                PRIMARY KEY (source, division, signature)
+            )""")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (source, status)")
+        self.connection.execute("""
+            CREATE TABLE IF NOT EXISTS worker_metrics (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                source TEXT NOT NULL,
+                report TEXT
+            )""")
+
+    # Adds a job for a division version unless it is already pending, leased or parsed, returns True
+    # when the job was added or re-queued. Failed jobs are queued again, and so are done ones: the
+    # tracker only asks for a finished version again after a restart, when its results were never
+    # sent, so they are parsed and published again.
+    def enqueue(self, source, division, url, signature):
+        with self.lock:
+            cursor = self.connection.execute(
+                "INSERT INTO jobs (source, division, signature, url, status, updated_at) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (source, division, signature) DO UPDATE SET status = excluded.status, attempts = 0, "
+                "owner = NULL, results = NULL, updated_at = excluded.updated_at WHERE jobs.status IN (?, ?)",
+                (source, division, signature, url, JOB_PENDING, time.time(), JOB_FAILED, JOB_DONE))
+            return cursor.rowcount == 1
+
+    # Claims up to limit pending or expired jobs for owner, returns [(division, signature, url)]
+    def lease(self, source, owner, limit, lease_seconds=60.0):
+        now = time.time()
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    "SELECT division, signature, url FROM jobs WHERE source = ? AND "
+                    "(status = ? OR (status = ? AND lease_expires < ?)) ORDER BY updated_at LIMIT ?",
+                    (source, JOB_PENDING, JOB_LEASED, now, limit)).fetchall()
+                self.connection.executemany(
+                    "UPDATE jobs SET status = ?, owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                    "WHERE source = ? AND division = ? AND signature = ?",
+                    [(JOB_LEASED, owner, now + lease_seconds, now, source, division, signature)
+                     for division, signature, _ in rows])
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return rows
+
+    # Stores parsed results if owner still holds the lease, returns whether they were stored
+    def complete(self, source, division, signature, owner, candidate_data, general_data, parties=None):
+        with self.lock:
+            cursor = self.connection.execute(
+                "UPDATE jobs SET status = ?, results = ?, updated_at = ? "
+                "WHERE source = ? AND division = ? AND signature = ? AND status = ? AND owner = ?",
+                (JOB_PARSED, json.dumps([candidate_data, general_data, parties]), time.time(),
+                 source, division, signature, JOB_LEASED, owner))
+            return cursor.rowcount == 1
+
+    # Returns a job to the queue after a failed fetch, or gives up after max_attempts
+    def fail(self, source, division, signature, owner, max_attempts=5):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, owner = NULL, updated_at = ? "
+                "WHERE source = ? AND division = ? AND signature = ? AND status = ? AND owner = ?",
+                (max_attempts, JOB_FAILED, JOB_PENDING, time.time(), source, division, signature, JOB_LEASED, owner))
+
+    # Returns [(division, signature, url, candidate_data, general_data, parties)] parsed and not yet handed on
+    def parsed(self, source):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT division, signature, url, results FROM jobs WHERE source = ? AND status = ? ORDER BY updated_at",
+                (source, JOB_PARSED)).fetchall()
+        return [(division, signature, url, *json.loads(results)) for division, signature, url, results in rows]
+
+    # Marks a parsed job as handed to the publisher
+    def finish(self, source, division, signature):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE jobs SET status = ?, updated_at = ? WHERE source = ? AND division = ? AND signature = ?",
+                (JOB_DONE, time.time(), source, division, signature))
+
+    # Stores a worker's drained metrics for the coordinator, whose registry the endpoint serves
+    def report_metrics(self, source, counters, histograms):
+        with self.lock:
+            self.connection.execute("INSERT INTO worker_metrics (source, report) VALUES (?, ?)",
+                                    (source, json.dumps([counters, histograms])))
+
+    # Returns and removes every stored metrics report for a source as [(counters, histograms)]
+    def take_metrics(self, source):
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.connection.execute(
+                    "SELECT id, report FROM worker_metrics WHERE source = ? ORDER BY id", (source,)).fetchall()
+                if rows:
+                    self.connection.execute("DELETE FROM worker_metrics WHERE source = ? AND id <= ?",
+                                            (source, rows[-1][0]))
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return [tuple(json.loads(report)) for _, report in rows]
+
+    # Returns {status: count} for a source
+    def counts(self, source):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT status, COUNT(*) FROM jobs WHERE source = ? GROUP BY status", (source,)).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
@@ -0,0 +1,64 @@
+import hashlib
+import json
+import logging
+from statestore import STATUS_QUEUED
+
+logger = logging.getLogger(__name__)
+
+# Function to fingerprint a division's parsed numbers, including every party's when they are given
+def result_fingerprint(candidate_data, general_data, parties=None):
+    numbers = [candidate_data, general_data] if parties is None else [candidate_data, general_data, parties]
+    payload = json.dumps(numbers, sort_keys=True)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# Function to fingerprint the text and link of an index table row
+def row_signature(*parts):
+    return hashlib.sha1("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+# Tracks index row signatures and result fingerprints per division, optionally backed by
+# a StateStore so a restarted monitor skips everything it already handled
+class DivisionTracker:
+    def __init__(self, store=None, source="default"):
+        self.store = store
+        self.source = source
+        self.signatures = {}
+        self.fingerprints = {}
+        if store is not None:
+            self.load()
+
+    # Function to resume from the store; divisions still waiting in the publish queue are fetched again
+    def load(self):
+        for division, row in self.store.load(self.source).items():
+            if row["row_signature"] and row["status"] != STATUS_QUEUED:
+                self.signatures[division] = row["row_signature"]
+            if row["fingerprint"]:
+                self.fingerprints[division] = row["fingerprint"]
+        logger.info("Resumed %s divisions for %s from %s.", len(self.signatures), self.source, self.store.path)
+
+    # Returns {division: url} for divisions that are new or whose index row changed
+    def divisions_to_fetch(self, index):
+        return {division: url for division, (url, signature) in index.items()
+                if self.signatures.get(division) != signature}
+
+    # Records the index row a division was last fetched for
+    def mark_fetched(self, division, signature, url=None):
+        self.signatures[division] = signature
+        if self.store is not None:
+            self.store.record_fetched(self.source, division, url, signature)
+
+    # Returns True if a division's numbers differ from the last published ones
+    def results_changed(self, division, candidate_data, general_data, parties=None):
+        return self.fingerprints.get(division) != result_fingerprint(candidate_data, general_data, parties)
+
+    # Records the numbers that were last published for a division, returns their fingerprint
+    def mark_published(self, division, candidate_data, general_data, parties=None):
+        fingerprint = result_fingerprint(candidate_data, general_data, parties)
+        self.fingerprints[division] = fingerprint
+        if self.store is not None:
+            self.store.record_queued(self.source, division, candidate_data, general_data, parties)
+        return fingerprint
+
+    # Records that Discord accepted a division's results
+    def mark_sent(self, division, fingerprint):
+        if self.store is not None:
+            self.store.record_sent(self.source, division, fingerprint)
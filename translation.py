@@ -0,0 +1,100 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from metrics import metrics
+
+bundled_names_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sinhala_names.json")
+
+# Where a translation came from; only remote ones still need an operator check
+SOURCE_DICTIONARY = "dictionary"
+SOURCE_CACHE = "cache"
+SOURCE_REMOTE = "remote"
+
+# English -> Sinhala names: bundled pre-verified dictionary first, then a persistent
+# LRU cache of operator-confirmed translations and corrections, then googletrans.
+# Names are translated per " - " part, so in "Jaffna District - Kayts" only "Kayts"
+# goes to googletrans. Remote translations are cached only once remember() confirms them.
+class SinhalaTranslator:
+    def __init__(self, cache_path="translation_cache.json", max_entries=2000, names_path=bundled_names_path):
+        self.cache_path = cache_path
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        self.remote = None
+
+        with open(names_path, "r", encoding="utf-8") as names_file:
+            names = json.load(names_file)
+        self.districts = dict(names["districts"])
+        for alias, district in names.get("aliases", {}).items():
+            self.districts[alias] = self.districts[district]
+        self.terms = names.get("terms", {})
+
+        self.cache = OrderedDict()
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as cache_file:
+                self.cache.update(json.load(cache_file))
+
+    # Function to translate one " - " separated part of a name from the dictionary
+    def _dictionary_part(self, part):
+        if part in self.districts:
+            return self.districts[part]
+        if part in self.terms:
+            return self.terms[part]
+        if part.endswith(" District") and part[:-len(" District")] in self.districts:
+            return f"{self.districts[part[:-len(' District')]]} {self.terms['District']}"
+        return None
+
+    def _remote(self, english):
+        if self.remote is None:
+            from googletrans import Translator
+            self.remote = Translator()
+        translated = self.remote.translate(english, src='en', dest='si')
+        return translated.text.replace("දිස්ත්රික්", "දිස්ත්‍රික්කය")
+
+    # Returns (sinhala_name, source) where source is dictionary, cache or remote
+    def translate(self, english):
+        with metrics.time("translate"):
+            return self._translate(english)
+
+    # Function to look up a confirmed translation of a whole name or one part
+    def _cached(self, english):
+        with self.lock:
+            if english in self.cache:
+                self.cache.move_to_end(english)
+                return self.cache[english]
+        return None
+
+    def _translate(self, english):
+        english = english.strip()
+        parts = [part.strip() for part in english.split(" - ")]
+        known = [self._dictionary_part(part) for part in parts]
+        if all(known):
+            return " - ".join(known), SOURCE_DICTIONARY
+
+        sinhala = self._cached(english)
+        if sinhala is not None:
+            return sinhala, SOURCE_CACHE
+
+        source = SOURCE_CACHE
+        for i, part in enumerate(parts):
+            if known[i] is None:
+                known[i] = self._cached(part)
+            if known[i] is None:
+                known[i] = self._remote(part)
+                source = SOURCE_REMOTE
+        return " - ".join(known), source
+
+    # Function to store a translation or an operator correction in the persistent cache
+    def remember(self, english, sinhala):
+        with self.lock:
+            self.cache[english.strip()] = sinhala
+            self.cache.move_to_end(english.strip())
+            while len(self.cache) > self.max_entries:
+                self.cache.popitem(last=False)
+            self._save()
+
+    def _save(self):
+        temporary_path = f"{self.cache_path}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as cache_file:
+            json.dump(self.cache, cache_file, ensure_ascii=False, indent=4)
+        os.replace(temporary_path, self.cache_path)